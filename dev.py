@@ -5,13 +5,15 @@ Provides commands for common development tasks.
 """
 
 import argparse
+import errno
 import subprocess
 import sys
 import os
 from pathlib import Path
 import shutil
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -20,13 +22,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Generated directories and files removed anywhere in the tree, split into
+# exact names (set lookup) and suffixes (single str.endswith call)
+CLEAN_DIR_NAMES = {'__pycache__', '.pytest_cache', 'htmlcov'}
+CLEAN_DIR_SUFFIXES = ('.egg-info',)
+CLEAN_FILE_NAMES = {'.coverage'}
+CLEAN_FILE_SUFFIXES = ('.pyc', '.pyo', '.pyd')
+
 def run_app(args):
     """Run the application"""
     try:
-        cmd = ['python', 'src/main.py']
+        from src.main import main as app_main
+        
+        argv = ['src/main.py']
         if args.debug:
-            cmd.append('--debug')
-        subprocess.run(cmd)
+            argv.append('--debug')
+        return app_main(argv)
     except KeyboardInterrupt:
         logger.info("Application stopped by user")
     except Exception as e:
@@ -37,37 +48,67 @@ def run_app(args):
 def run_tests(args):
     """Run tests with specified options"""
     try:
-        cmd = ['python', 'run_tests.py']
+        import run_tests as test_runner
+        
+        argv = []
         if args.coverage:
-            cmd.append('--coverage')
+            argv.append('--coverage')
         if args.html:
-            cmd.append('--html')
+            argv.append('--html')
         if args.verbose:
-            cmd.append('--verbose')
+            argv.append('--verbose')
         if args.failfast:
-            cmd.append('--failfast')
+            argv.append('--failfast')
         if args.file:
-            cmd.extend(['--file', args.file])
+            argv.extend(['--file', args.file])
         
-        subprocess.run(cmd)
+        return test_runner.main(argv)
     except Exception as e:
         logger.error(f"Error running tests: {str(e)}")
         return 1
-    return 0
+
+def _remove_one(path):
+    """Remove a single file or directory tree"""
+    if os.path.islink(path) or not os.path.isdir(path):
+        os.unlink(path)
+        return path
+    
+    try:
+        # Cheap path for directories that are already empty
+        os.rmdir(path)
+    except OSError as e:
+        if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+            raise
+        shutil.rmtree(path)
+    return path
+
+def _find_clean_targets(root, exclude):
+    """
+    Walk the tree once and yield every generated directory and file.
+    
+    Matched directories are removed as a whole, so they are pruned from the
+    walk and their contents are never checked against the file patterns.
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.normpath(entry.path) in exclude:
+                        continue
+                    if name in CLEAN_DIR_NAMES or name.endswith(CLEAN_DIR_SUFFIXES):
+                        yield entry.path
+                    else:
+                        stack.append(entry.path)
+                elif name in CLEAN_FILE_NAMES or name.endswith(CLEAN_FILE_SUFFIXES):
+                    yield entry.path
 
 def clean(args):
     """Clean up generated files and directories"""
     patterns = [
-        '**/__pycache__',
-        '**/*.pyc',
-        '**/*.pyo',
-        '**/*.pyd',
-        '**/.pytest_cache',
-        '**/.coverage',
-        '**/htmlcov',
         'build/',
         'dist/',
-        '**/*.egg-info',
     ]
     
     if args.all:
@@ -77,14 +118,17 @@ def clean(args):
             'data/*.db'
         ])
     
+    paths = [str(path) for pattern in patterns for path in Path('.').glob(pattern)]
+    paths.extend(_find_clean_targets('.', exclude=set(paths)))
+    
+    # Removals are bound by filesystem metadata syscalls, so overlap them
     count = 0
-    for pattern in patterns:
-        for path in Path('.').glob(pattern):
+    with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as executor:
+        futures = {executor.submit(_remove_one, path): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
             try:
-                if path.is_file():
-                    path.unlink()
-                else:
-                    shutil.rmtree(path)
+                future.result()
                 count += 1
                 logger.info(f"Removed: {path}")
             except Exception as e:
@@ -101,16 +145,16 @@ def setup_dev(args):
             logger.info("Creating virtual environment...")
             subprocess.run([sys.executable, '-m', 'venv', 'venv'])
         
-        # Activate virtual environment
+        # The venv's pip already runs under the venv interpreter, so no
+        # shell is needed to activate it first
         if os.name == 'nt':  # Windows
-            activate_script = 'venv\\Scripts\\activate'
+            pip_path = Path('venv/Scripts/pip.exe')
         else:  # Unix
-            activate_script = 'source venv/bin/activate'
+            pip_path = Path('venv/bin/pip')
         
         # Install dependencies
         logger.info("Installing dependencies...")
-        pip_cmd = 'pip install -r requirements.txt'
-        subprocess.run(f"{activate_script} && {pip_cmd}", shell=True)
+        subprocess.run([str(pip_path), 'install', '-r', 'requirements.txt'])
         
         # Create necessary directories
         for dir_name in ['data', 'logs']:
@@ -127,10 +171,46 @@ def setup_dev(args):
         logger.error(f"Error setting up development environment: {str(e)}")
         return 1
 
+def _previous_backup(backup_dir):
+    """Return the most recent backup created before backup_dir, if any"""
+    # Backup names embed a sortable timestamp
+    previous = sorted(
+        path for path in backup_dir.parent.glob('backup_*')
+        if path.is_dir() and path != backup_dir
+    )
+    return previous[-1] if previous else None
+
+def _make_backup_copier(previous_dir):
+    """
+    Create a copy function that hardlinks files unchanged since the previous backup
+    
+    Args:
+        previous_dir: Previous backup directory, or None to always copy
+        
+    Returns:
+        Copy function usable as shutil.copytree's copy_function
+    """
+    def copy(src, dst):
+        if previous_dir is not None:
+            previous = previous_dir / os.path.relpath(src)
+            try:
+                src_stat = os.stat(src)
+                previous_stat = os.stat(previous)
+                if (previous_stat.st_size == src_stat.st_size and
+                        previous_stat.st_mtime_ns == src_stat.st_mtime_ns):
+                    os.link(previous, dst)
+                    return dst
+            except OSError:
+                # No previous copy, or hardlinks unsupported here
+                pass
+        return shutil.copy2(src, dst)
+    
+    return copy
+
 def create_backup(args):
     """Create a backup of important files"""
     try:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
         backup_dir = Path(f'backups/backup_{timestamp}')
         backup_dir.mkdir(parents=True)
         
@@ -150,15 +230,23 @@ def create_backup(args):
                 'logs/'
             ])
         
-        for path in backup_paths:
+        # copy2 preserves mtimes, so unchanged files can be hardlinked
+        # to the previous backup instead of being read and written again
+        copy = _make_backup_copier(_previous_backup(backup_dir))
+        
+        def copy_one(path):
             src_path = Path(path)
             if src_path.exists():
                 dst_path = backup_dir / path
                 if src_path.is_dir():
-                    shutil.copytree(src_path, dst_path)
+                    shutil.copytree(src_path, dst_path, copy_function=copy)
                 else:
                     dst_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src_path, dst_path)
+                    copy(str(src_path), str(dst_path))
+        
+        # The backup paths are independent trees, so copy them concurrently
+        with ThreadPoolExecutor(max_workers=len(backup_paths)) as executor:
+            list(executor.map(copy_one, backup_paths))
         
         logger.info(f"Backup created at: {backup_dir}")
         return 0
@@ -6,6 +6,8 @@ with a perfect match case.
 
 import sys
 import os
+from dataclasses import asdict
+from operator import attrgetter
 from pathlib import Path
 
 # Add project root to Python path
@@ -13,8 +15,22 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
 from src.pdf_processor import PDFProcessor
-from src.notifier import SlackNotifier, NotificationConfig
-from src.database import DatabaseManager
+
+# ComparisonResult fields stored with each comparison record
+TEXT_FIELDS = ('item_code', 'description', 'status')
+NUMERIC_FIELDS = (
+    'offer_quantity', 'delivered_quantity',
+    'offer_price', 'invoiced_price',
+    'quantity_difference', 'price_difference'
+)
+get_text_fields = attrgetter(*TEXT_FIELDS)
+get_numeric_fields = attrgetter(*NUMERIC_FIELDS)
+
+def result_to_record(result):
+    """Convert a ComparisonResult into a JSON-serializable dict"""
+    record = dict(zip(TEXT_FIELDS, get_text_fields(result)))
+    record.update(zip(NUMERIC_FIELDS, map(float, get_numeric_fields(result))))
+    return record
 
 def main():
     """Run the example comparison"""
@@ -26,8 +42,8 @@ def main():
     
     # Get file paths
     current_dir = Path(__file__).parent
-    offer_path = current_dir / "offer.pdf"
-    invoice_path = current_dir / "invoice.pdf"
+    offer_path = str(current_dir / "offer.pdf")
+    invoice_path = str(current_dir / "invoice.pdf")
     
     print(f"\nProcessing files:")
     print(f"Offer:   {offer_path}")
@@ -35,11 +51,11 @@ def main():
     
     # Extract items from PDFs
     print("\nExtracting items from offer...")
-    offer_items = pdf_processor.extract_items_from_pdf(str(offer_path))
+    offer_items = pdf_processor.extract_items_from_pdf(offer_path)
     print(f"Found {len(offer_items)} items in offer")
     
     print("\nExtracting items from invoice...")
-    invoice_items = pdf_processor.extract_items_from_pdf(str(invoice_path))
+    invoice_items = pdf_processor.extract_items_from_pdf(invoice_path)
     print(f"Found {len(invoice_items)} items in invoice")
     
     # Compare documents
@@ -62,35 +78,17 @@ def main():
     
     # Store results in database
     print("\nStoring results in database...")
+    from src.database import DatabaseManager
     db_manager = DatabaseManager("data/comparison_history.db")
     
-    summary = {
-        'total_items': len(results),
-        'matches': len([r for r in results if r.status == 'match']),
-        'quantity_mismatches': len([r for r in results if r.status == 'quantity_mismatch']),
-        'price_mismatches': len([r for r in results if r.status == 'price_mismatch']),
-        'missing_items': len([r for r in results if r.status == 'missing']),
-        'extra_items': len([r for r in results if r.status == 'extra_item']),
-        'total_quantity_difference': sum(abs(r.quantity_difference) for r in results),
-        'total_price_difference': sum(abs(r.price_difference) for r in results)
-    }
+    summary = pdf_processor.generate_summary(results)
     
     record_id = db_manager.store_comparison(
-        offer_path=str(offer_path),
-        invoice_paths=[str(invoice_path)],
+        offer_path=offer_path,
+        invoice_paths=[invoice_path],
         status='success',
         summary=summary,
-        results=[{
-            'item_code': r.item_code,
-            'description': r.description,
-            'status': r.status,
-            'offer_quantity': float(r.offer_quantity),
-            'delivered_quantity': float(r.delivered_quantity),
-            'offer_price': float(r.offer_price),
-            'invoiced_price': float(r.invoiced_price),
-            'quantity_difference': float(r.quantity_difference),
-            'price_difference': float(r.price_difference)
-        } for r in results]
+        results=[result_to_record(r) for r in results]
     )
     
     print(f"Results stored with ID: {record_id}")
@@ -98,6 +96,9 @@ def main():
     # Send notification (if configured)
     if os.environ.get('SLACK_WEBHOOK_URL'):
         print("\nSending Slack notification...")
+        # Only pull in the HTTP stack when a webhook is configured
+        from src.notifier import SlackNotifier, NotificationConfig
+        
         notifier = SlackNotifier(NotificationConfig(
             webhook_url=os.environ['SLACK_WEBHOOK_URL'],
             channel="#pdf-comparison-alerts",
@@ -110,9 +111,9 @@ def main():
         ))
         
         notifier.send_comparison_results(
-            offer_path=str(offer_path),
-            invoice_paths=[str(invoice_path)],
-            results=[vars(r) for r in results],
+            offer_path=offer_path,
+            invoice_paths=[invoice_path],
+            results=[asdict(r) for r in results],
             summary=summary
         )
     
@@ -6,11 +6,13 @@ Generates test PDFs and runs comparisons to demonstrate functionality.
 
 import os
 import sys
+import argparse
 import subprocess
 import logging
 from pathlib import Path
 import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(
@@ -20,20 +22,24 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def run_command(cmd, cwd=None):
-    """Run a command and return its output"""
-    try:
-        result = subprocess.run(
-            cmd,
-            cwd=cwd,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
+    """Run a command, forwarding its output to the log as it is produced"""
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1
+    )
+    with process.stdout:
+        for line in process.stdout:
+            logger.info(line.rstrip())
+    
+    returncode = process.wait()
+    if returncode != 0:
         logger.error(f"Command failed: {' '.join(cmd)}")
-        logger.error(f"Error output: {e.stderr}")
-        raise
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
 
 def setup_test_environment():
     """Set up the test environment"""
@@ -44,78 +50,67 @@ def setup_test_environment():
     for dir_path in test_dirs:
         Path(dir_path).mkdir(parents=True, exist_ok=True)
     
-    # Generate test PDFs
+    # Generate test PDFs in-process rather than paying for a fresh interpreter
     logger.info("Generating test PDFs...")
-    run_command(['python', 'tools/generate_test_pdfs.py'])
-    
-    # Copy test PDFs to test directories
-    for pdf_file in Path('test_pdfs').glob('*.pdf'):
-        if 'offer' in pdf_file.name:
-            shutil.copy2(pdf_file, 'test_data/offers/')
-        elif 'invoice' in pdf_file.name:
-            shutil.copy2(pdf_file, 'test_data/invoices/')
-
-def run_quick_test():
-    """Run a quick test of the tool"""
-    logger.info("\nRunning quick test of PDF Comparison Tool...")
+    from tools.generate_test_pdfs import main as generate_test_pdfs
+    generate_test_pdfs()
     
-    # 1. Perfect Match Test
-    logger.info("\n1. Testing Perfect Match Case...")
-    run_command([
-        'python', 'src/main.py',
-        '--offer', 'test_data/offers/offer_perfect.pdf',
-        '--invoice', 'test_data/invoices/invoice_perfect.pdf'
-    ])
-    input("\nPress Enter to continue to next test...")
+    # Copy test PDFs to test directories; scandir yields names and file
+    # types from the directory listing without a Path or stat per entry
+    with os.scandir('test_pdfs') as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.endswith('.pdf') or not entry.is_file():
+                continue
+            if 'offer' in name:
+                shutil.copy2(entry.path, 'test_data/offers/')
+            elif 'invoice' in name:
+                shutil.copy2(entry.path, 'test_data/invoices/')
 
-    # 2. Quantity Mismatch Test
-    logger.info("\n2. Testing Quantity Mismatch Case...")
-    run_command([
-        'python', 'src/main.py',
-        '--offer', 'test_data/offers/offer_quantity_mismatch.pdf',
-        '--invoice', 'test_data/invoices/invoice_quantity_mismatch.pdf'
-    ])
-    input("\nPress Enter to continue to next test...")
+# Comparison scenarios: (name, offer file, invoice files)
+CASES = [
+    ('Perfect Match', 'offer_perfect.pdf', ['invoice_perfect.pdf']),
+    ('Quantity Mismatch', 'offer_quantity_mismatch.pdf', ['invoice_quantity_mismatch.pdf']),
+    ('Price Mismatch', 'offer_price_mismatch.pdf', ['invoice_price_mismatch.pdf']),
+    ('Missing Items', 'offer_missing_items.pdf', ['invoice_missing_items.pdf']),
+    ('Extra Items', 'offer_extra_items.pdf', ['invoice_extra_items.pdf']),
+    ('Partial Delivery', 'offer_partial.pdf', ['invoice_partial_1.pdf', 'invoice_partial_2.pdf']),
+]
 
-    # 3. Price Mismatch Test
-    logger.info("\n3. Testing Price Mismatch Case...")
-    run_command([
+def run_case(offer, invoices):
+    """Run a single comparison case"""
+    return run_command([
         'python', 'src/main.py',
-        '--offer', 'test_data/offers/offer_price_mismatch.pdf',
-        '--invoice', 'test_data/invoices/invoice_price_mismatch.pdf'
+        '--offer', f'test_data/offers/{offer}',
+        '--invoice', *(f'test_data/invoices/{invoice}' for invoice in invoices)
     ])
-    input("\nPress Enter to continue to next test...")
 
-    # 4. Missing Items Test
-    logger.info("\n4. Testing Missing Items Case...")
-    run_command([
-        'python', 'src/main.py',
-        '--offer', 'test_data/offers/offer_missing_items.pdf',
-        '--invoice', 'test_data/invoices/invoice_missing_items.pdf'
-    ])
-    input("\nPress Enter to continue to next test...")
-
-    # 5. Extra Items Test
-    logger.info("\n5. Testing Extra Items Case...")
-    run_command([
-        'python', 'src/main.py',
-        '--offer', 'test_data/offers/offer_extra_items.pdf',
-        '--invoice', 'test_data/invoices/invoice_extra_items.pdf'
-    ])
-    input("\nPress Enter to continue to next test...")
-
-    # 6. Partial Delivery Test
-    logger.info("\n6. Testing Partial Delivery Case...")
-    run_command([
-        'python', 'src/main.py',
-        '--offer', 'test_data/offers/offer_partial.pdf',
-        '--invoice', 'test_data/invoices/invoice_partial_1.pdf',
-        'test_data/invoices/invoice_partial_2.pdf'
-    ])
-    input("\nPress Enter to continue to GUI test...")
+def run_quick_test(interactive=False):
+    """Run a quick test of the tool"""
+    logger.info("\nRunning quick test of PDF Comparison Tool...")
+    
+    # Qt allows only one QApplication per process, so each case runs main.py
+    # in its own interpreter
+    if interactive:
+        for i, (name, offer, invoices) in enumerate(CASES, 1):
+            logger.info(f"\n{i}. Testing {name} Case...")
+            run_case(offer, invoices)
+            input("\nPress Enter to continue to next test...")
+    else:
+        # The cases use disjoint PDFs, so their child processes can run side by side
+        logger.info(f"\nTesting {len(CASES)} comparison cases concurrently...")
+        with ThreadPoolExecutor(max_workers=len(CASES)) as executor:
+            futures = {
+                executor.submit(run_case, offer, invoices): name
+                for name, offer, invoices in CASES
+            }
+            for future in as_completed(futures):
+                future.result()
+                logger.info(f"{futures[future]} case completed")
+        input("\nPress Enter to continue to GUI test...")
 
-    # 7. GUI Test
-    logger.info("\n7. Testing GUI Interface...")
+    # GUI Test
+    logger.info("\nTesting GUI Interface...")
     logger.info("Starting GUI application. Please:")
     logger.info("1. Drag and drop PDFs from test_data/offers and test_data/invoices")
     logger.info("2. Click 'Compare' to see results")
@@ -142,11 +137,22 @@ def test_monitoring():
     except KeyboardInterrupt:
         logger.info("\nMonitoring stopped")
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Quick test for PDF Comparison Tool')
+    parser.add_argument('--interactive', action='store_true',
+                        help='Run comparison cases one at a time, pausing after each')
+    return parser.parse_args()
+
 def main():
     """Main entry point"""
+    args = parse_args()
+    
     try:
-        # Check if running from project root
-        if not all(Path(f).exists() for f in ['src', 'tools', 'tests']):
+        # Check if running from project root with a single directory listing
+        with os.scandir('.') as entries:
+            root_dirs = {entry.name for entry in entries if entry.is_dir()}
+        if not {'src', 'tools', 'tests'} <= root_dirs:
             logger.error("Please run this script from the project root directory")
             return 1
         
@@ -165,7 +171,7 @@ def main():
         setup_test_environment()
         
         # Run tests
-        run_quick_test()
+        run_quick_test(interactive=args.interactive)
         
         # Test monitoring
         test_monitoring()
@@ -5,14 +5,12 @@ Runs all tests and generates a coverage report.
 """
 
 import sys
-import os
 import subprocess
 import argparse
-import webbrowser
 from pathlib import Path
-from datetime import datetime
+import time
 
-def parse_args():
+def parse_args(argv=None):
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description='Run tests for PDF Comparison Tool')
     parser.add_argument('--coverage', action='store_true', help='Generate coverage report')
@@ -20,43 +18,43 @@ def parse_args():
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     parser.add_argument('--failfast', action='store_true', help='Stop on first failure')
     parser.add_argument('--file', '-f', help='Run specific test file')
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
-def run_tests(args):
-    """Run the tests with specified options"""
-    # Base command
-    cmd = ['pytest']
+def build_pytest_args(args):
+    """Build the pytest argument list for the given options"""
+    pytest_args = []
     
     # Add options
     if args.verbose:
-        cmd.append('-v')
+        pytest_args.append('-v')
     if args.failfast:
-        cmd.append('--failfast')
+        pytest_args.append('--failfast')
     
     # Coverage options
     if args.coverage or args.html:
-        cmd.extend([
+        pytest_args.extend([
             '--cov=src',
             '--cov-report=term-missing'
         ])
         if args.html:
-            cmd.append('--cov-report=html')
+            pytest_args.append('--cov-report=html')
     
     # Specific file or all tests
     if args.file:
-        cmd.append(args.file)
+        pytest_args.append(args.file)
     else:
-        cmd.append('tests/')
+        pytest_args.append('tests/')
     
-    # Run tests
+    return pytest_args
+
+def run_tests(args):
+    """Run the tests with specified options"""
+    # Run pytest in this interpreter instead of paying for a fresh
+    # interpreter start and pytest import on every run
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", file=sys.stderr)
-            print(result.stderr, file=sys.stderr)
+        import pytest
         
-        return result.returncode
+        return int(pytest.main(build_pytest_args(args)))
     except Exception as e:
         print(f"Error running tests: {str(e)}", file=sys.stderr)
         return 1
@@ -66,13 +64,15 @@ def generate_test_report(success, args):
     report_dir = Path('test-reports')
     report_dir.mkdir(exist_ok=True)
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # Format both timestamps from a single clock read
+    now = time.localtime()
+    timestamp = time.strftime('%Y%m%d_%H%M%S', now)
     report_path = report_dir / f'test_report_{timestamp}.txt'
     
     with open(report_path, 'w') as f:
         f.write("PDF Comparison Tool - Test Report\n")
         f.write("================================\n\n")
-        f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Date: {time.strftime('%Y-%m-%d %H:%M:%S', now)}\n")
         f.write(f"Status: {'SUCCESS' if success else 'FAILURE'}\n\n")
         
         # Test configuration
@@ -109,12 +109,12 @@ def open_coverage_report():
     else:
         print("Coverage report not found. Did you run with --html option?", file=sys.stderr)
 
-def main():
+def main(argv=None):
     """Main entry point"""
     print("PDF Comparison Tool - Test Runner")
     print("================================")
     
-    args = parse_args()
+    args = parse_args(argv)
     
     # Ensure we're in the project root directory
     if not Path('src').exists() or not Path('tests').exists():
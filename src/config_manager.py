@@ -1,23 +1,57 @@
 import yaml
+import copy
+import hashlib
 import logging
+import re
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
-@dataclass
+# Prefer the libyaml-backed loader/dumper, falling back to pure Python
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+logger = logging.getLogger(__name__)
+
+# Parsed configuration per resolved path as ((mtime_ns, size), digest, config)
+# so that repeated ConfigManager instances skip reparsing an unchanged file
+_PARSE_CACHE: Dict[str, Tuple[Tuple[int, int], str, Dict[str, Any]]] = {}
+
+# save_config prefixes the YAML with the SHA-256 of the rest of the file
+_HASH_HEADER = re.compile(rb'# sha256: ([0-9a-f]{64})\r?\n')
+
+# Bytes read when probing a file for its hash header
+HEADER_PROBE_SIZE = 4096
+
+def _file_signature(config_file: Path) -> Tuple[int, int]:
+    """Return a cheap signature that changes whenever the file is rewritten"""
+    stat = config_file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+def _content_digest(data: bytes) -> str:
+    """Return the SHA-256 of the YAML content, excluding any hash header"""
+    match = _HASH_HEADER.match(data)
+    if match:
+        data = data[match.end():]
+    return hashlib.sha256(data).hexdigest()
+
+@dataclass(frozen=True)
 class MonitoringConfig:
     enabled: bool
     check_interval: int
     offers_folder: str
     invoices_folder: str
 
-@dataclass
+@dataclass(frozen=True)
 class ProcessingConfig:
     price_tolerance: float
     extraction_method: str
     track_partial_deliveries: bool
 
-@dataclass
+@dataclass(frozen=True)
 class NotificationConfig:
     enabled: bool
     webhook_url: str
@@ -29,7 +63,7 @@ class NotificationConfig:
     price_threshold: float
     quantity_threshold: int
 
-@dataclass
+@dataclass(frozen=True)
 class UIConfig:
     theme: str
     window_width: int
@@ -37,18 +71,127 @@ class UIConfig:
     auto_refresh: bool
     refresh_interval: int
 
-@dataclass
+@dataclass(frozen=True)
 class DatabaseConfig:
     path: str
     retention_days: int
 
-@dataclass
+@dataclass(frozen=True)
 class LoggingConfig:
     level: str
     file: str
     max_size: int
     backup_count: int
 
+# Defaults written by reset_to_defaults and used for any missing setting
+DEFAULT_CONFIG: Dict[str, Any] = {
+    'monitoring': {
+        'enabled': True,
+        'check_interval': 5,
+        'folders': {
+            'offers': '',
+            'invoices': ''
+        }
+    },
+    'processing': {
+        'price_tolerance': 0.02,
+        'extraction_method': 'intelligent',
+        'track_partial_deliveries': True
+    },
+    'notifications': {
+        'slack': {
+            'enabled': True,
+            'webhook_url': '',
+            'channel': '#pdf-comparison-alerts',
+            'notify_on': {
+                'price_discrepancies': True,
+                'quantity_mismatches': True,
+                'missing_items': True,
+                'successful_comparisons': False
+            },
+            'thresholds': {
+                'price_difference': 0.0,
+                'quantity_difference': 0
+            }
+        }
+    },
+    'ui': {
+        'theme': 'light',
+        'window': {
+            'width': 1024,
+            'height': 768
+        },
+        'auto_refresh': True,
+        'refresh_interval': 60
+    },
+    'database': {
+        'path': 'data/comparison_history.db',
+        'retention_days': 90
+    },
+    'logging': {
+        'level': 'INFO',
+        'file': 'logs/comparison_tool.log',
+        'max_size': 10485760,
+        'backup_count': 5
+    }
+}
+
+# Section dataclass fields mapped to their key path in the YAML document and
+# an optional converter applied to the value
+_SECTION_FIELDS = {
+    'monitoring': (MonitoringConfig, (
+        ('enabled', ('monitoring', 'enabled'), None),
+        ('check_interval', ('monitoring', 'check_interval'), None),
+        ('offers_folder', ('monitoring', 'folders', 'offers'), None),
+        ('invoices_folder', ('monitoring', 'folders', 'invoices'), None),
+    )),
+    'processing': (ProcessingConfig, (
+        ('price_tolerance', ('processing', 'price_tolerance'), None),
+        ('extraction_method', ('processing', 'extraction_method'), None),
+        ('track_partial_deliveries', ('processing', 'track_partial_deliveries'), None),
+    )),
+    'notification': (NotificationConfig, (
+        ('enabled', ('notifications', 'slack', 'enabled'), None),
+        ('webhook_url', ('notifications', 'slack', 'webhook_url'), None),
+        ('channel', ('notifications', 'slack', 'channel'), None),
+        ('notify_price_discrepancies', ('notifications', 'slack', 'notify_on', 'price_discrepancies'), None),
+        ('notify_quantity_mismatches', ('notifications', 'slack', 'notify_on', 'quantity_mismatches'), None),
+        ('notify_missing_items', ('notifications', 'slack', 'notify_on', 'missing_items'), None),
+        ('notify_successful_comparisons', ('notifications', 'slack', 'notify_on', 'successful_comparisons'), None),
+        ('price_threshold', ('notifications', 'slack', 'thresholds', 'price_difference'), float),
+        ('quantity_threshold', ('notifications', 'slack', 'thresholds', 'quantity_difference'), int),
+    )),
+    'ui': (UIConfig, (
+        ('theme', ('ui', 'theme'), None),
+        ('window_width', ('ui', 'window', 'width'), None),
+        ('window_height', ('ui', 'window', 'height'), None),
+        ('auto_refresh', ('ui', 'auto_refresh'), None),
+        ('refresh_interval', ('ui', 'refresh_interval'), None),
+    )),
+    'database': (DatabaseConfig, (
+        ('path', ('database', 'path'), None),
+        ('retention_days', ('database', 'retention_days'), None),
+    )),
+    'logging': (LoggingConfig, (
+        ('level', ('logging', 'level'), None),
+        ('file', ('logging', 'file'), None),
+        ('max_size', ('logging', 'max_size'), None),
+        ('backup_count', ('logging', 'backup_count'), None),
+    )),
+}
+
+def _lookup(config: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    """Follow a key path through nested dicts, falling back to the default"""
+    node = config
+    for key in path:
+        if key not in node:
+            node = DEFAULT_CONFIG
+            for default_key in path:
+                node = node[default_key]
+            break
+        node = node[key]
+    return node
+
 class ConfigManager:
     def __init__(self, config_path: str = "config/settings.yaml"):
         """
@@ -60,11 +203,11 @@ class ConfigManager:
         self.config_path = config_path
         self.config: Dict[str, Any] = {}
         
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        # Section dataclasses built from self.config, cleared on every change
+        self._cache: Dict[str, Any] = {}
+        
+        # Set while a batch() block defers saving
+        self._in_batch = False
         
         # Load configuration
         self.load_config()
@@ -80,19 +223,60 @@ class ConfigManager:
             config_file = Path(self.config_path)
             
             if not config_file.exists():
-                logging.error(f"Configuration file not found: {self.config_path}")
+                logger.error("Configuration file not found: %s", self.config_path)
                 return False
             
-            with open(config_file, 'r') as f:
-                self.config = yaml.safe_load(f)
+            cache_key = str(config_file.resolve())
+            signature = _file_signature(config_file)
+            cached = _PARSE_CACHE.get(cache_key)
+            
+            if cached is not None and (cached[0] == signature or
+                                       self._quick_version_probe(config_file, cached[1])):
+                # Hand out a copy so callers cannot mutate the cached entry
+                self.config = copy.deepcopy(cached[2])
+                _PARSE_CACHE[cache_key] = (signature, cached[1], cached[2])
+            else:
+                data = config_file.read_bytes()
+                self.config = yaml.load(data, Loader=_YamlLoader)
+                _PARSE_CACHE[cache_key] = (
+                    signature, _content_digest(data), copy.deepcopy(self.config)
+                )
             
-            logging.info(f"Loaded configuration from {self.config_path}")
+            self._cache.clear()
+            
+            logger.info("Loaded configuration from %s", self.config_path)
             return True
             
         except Exception as e:
-            logging.error(f"Error loading configuration: {str(e)}")
+            logger.error("Error loading configuration: %s", e)
             return False
 
+    def _quick_version_probe(self, config_file: Path, digest: str) -> bool:
+        """
+        Check whether a file whose mtime or size changed still holds the
+        content behind digest, without parsing it
+        
+        Args:
+            config_file: Configuration file to probe
+            digest: Content digest recorded when the file was last parsed
+            
+        Returns:
+            bool: True if the cached configuration is still current
+        """
+        with open(config_file, 'rb') as f:
+            head = f.read(HEADER_PROBE_SIZE)
+            match = _HASH_HEADER.match(head)
+            if match and match.group(1).decode('ascii') != digest:
+                # Rewritten by save_config with different content
+                return False
+            
+            # A matching or missing header is not proof on its own, since
+            # hand edits leave the header untouched; hashing is still far
+            # cheaper than parsing the YAML
+            data = head + f.read()
+        
+        return _content_digest(data) == digest
+
     def save_config(self) -> bool:
         """
         Save current configuration to YAML file
@@ -100,89 +284,95 @@ class ConfigManager:
         Returns:
             bool: True if configuration was saved successfully
         """
+        # Every update_* and reset path funnels through here after mutating
+        # self.config, so drop the derived section objects first
+        self._cache.clear()
+        
         try:
             config_file = Path(self.config_path)
             
             # Ensure directory exists
             config_file.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(config_file, 'w') as f:
-                yaml.dump(self.config, f, default_flow_style=False)
+            text = yaml.dump(self.config, Dumper=_YamlDumper, default_flow_style=False)
+            data = text.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            config_file.write_bytes(f"# sha256: {digest}\n".encode('ascii') + data)
+            
+            # The file now holds exactly self.config, so refresh the cache
+            _PARSE_CACHE[str(config_file.resolve())] = (
+                _file_signature(config_file), digest, copy.deepcopy(self.config)
+            )
             
-            logging.info(f"Saved configuration to {self.config_path}")
+            logger.info("Saved configuration to %s", self.config_path)
             return True
             
         except Exception as e:
-            logging.error(f"Error saving configuration: {str(e)}")
+            logger.error("Error saving configuration: %s", e)
             return False
 
+    @contextmanager
+    def batch(self):
+        """
+        Group several updates into a single save
+        
+        update_* and reset_to_defaults calls inside the block only change
+        the in-memory configuration; the file is written once on exit.
+        """
+        if self._in_batch:
+            # Nested batches are folded into the outermost one
+            yield self
+            return
+        
+        self._in_batch = True
+        try:
+            yield self
+        finally:
+            self._in_batch = False
+        self.save_config()
+
+    def _save_or_defer(self) -> bool:
+        """Save the configuration, or only drop derived state inside batch()"""
+        if self._in_batch:
+            self._cache.clear()
+            return True
+        return self.save_config()
+
+    def _get_section(self, section: str) -> Any:
+        """Build the dataclass for a section, memoized until the config changes"""
+        config = self._cache.get(section)
+        if config is None:
+            cls, fields = _SECTION_FIELDS[section]
+            values = {}
+            for name, path, convert in fields:
+                value = _lookup(self.config, path)
+                values[name] = convert(value) if convert else value
+            config = self._cache[section] = cls(**values)
+        return config
+
     def get_monitoring_config(self) -> MonitoringConfig:
         """Get monitoring configuration"""
-        monitoring = self.config.get('monitoring', {})
-        return MonitoringConfig(
-            enabled=monitoring.get('enabled', True),
-            check_interval=monitoring.get('check_interval', 5),
-            offers_folder=monitoring.get('folders', {}).get('offers', ''),
-            invoices_folder=monitoring.get('folders', {}).get('invoices', '')
-        )
+        return self._get_section('monitoring')
 
     def get_processing_config(self) -> ProcessingConfig:
         """Get PDF processing configuration"""
-        processing = self.config.get('processing', {})
-        return ProcessingConfig(
-            price_tolerance=processing.get('price_tolerance', 0.02),
-            extraction_method=processing.get('extraction_method', 'intelligent'),
-            track_partial_deliveries=processing.get('track_partial_deliveries', True)
-        )
+        return self._get_section('processing')
 
     def get_notification_config(self) -> NotificationConfig:
         """Get notification configuration"""
-        notifications = self.config.get('notifications', {}).get('slack', {})
-        notify_on = notifications.get('notify_on', {})
-        thresholds = notifications.get('thresholds', {})
-        
-        return NotificationConfig(
-            enabled=notifications.get('enabled', True),
-            webhook_url=notifications.get('webhook_url', ''),
-            channel=notifications.get('channel', '#pdf-comparison-alerts'),
-            notify_price_discrepancies=notify_on.get('price_discrepancies', True),
-            notify_quantity_mismatches=notify_on.get('quantity_mismatches', True),
-            notify_missing_items=notify_on.get('missing_items', True),
-            notify_successful_comparisons=notify_on.get('successful_comparisons', False),
-            price_threshold=float(thresholds.get('price_difference', 0.0)),
-            quantity_threshold=int(thresholds.get('quantity_difference', 0))
-        )
+        return self._get_section('notification')
 
     def get_ui_config(self) -> UIConfig:
         """Get UI configuration"""
-        ui = self.config.get('ui', {})
-        window = ui.get('window', {})
-        
-        return UIConfig(
-            theme=ui.get('theme', 'light'),
-            window_width=window.get('width', 1024),
-            window_height=window.get('height', 768),
-            auto_refresh=ui.get('auto_refresh', True),
-            refresh_interval=ui.get('refresh_interval', 60)
-        )
+        return self._get_section('ui')
 
     def get_database_config(self) -> DatabaseConfig:
         """Get database configuration"""
-        database = self.config.get('database', {})
-        return DatabaseConfig(
-            path=database.get('path', 'data/comparison_history.db'),
-            retention_days=database.get('retention_days', 90)
-        )
+        return self._get_section('database')
 
     def get_logging_config(self) -> LoggingConfig:
         """Get logging configuration"""
-        logging_config = self.config.get('logging', {})
-        return LoggingConfig(
-            level=logging_config.get('level', 'INFO'),
-            file=logging_config.get('file', 'logs/comparison_tool.log'),
-            max_size=logging_config.get('max_size', 10485760),
-            backup_count=logging_config.get('backup_count', 5)
-        )
+        return self._get_section('logging')
 
     def update_monitoring_config(self, 
                                enabled: Optional[bool] = None,
@@ -215,10 +405,10 @@ class ConfigManager:
                 if invoices_folder is not None:
                     self.config['monitoring']['folders']['invoices'] = invoices_folder
             
-            return self.save_config()
+            return self._save_or_defer()
             
         except Exception as e:
-            logging.error(f"Error updating monitoring configuration: {str(e)}")
+            logger.error("Error updating monitoring configuration: %s", e)
             return False
 
     def update_notification_config(self,
@@ -256,10 +446,10 @@ class ConfigManager:
                     setting = key.replace('notify_', '')
                     slack_config['notify_on'][setting] = value
             
-            return self.save_config()
+            return self._save_or_defer()
             
         except Exception as e:
-            logging.error(f"Error updating notification configuration: {str(e)}")
+            logger.error("Error updating notification configuration: %s", e)
             return False
 
     def update_processing_config(self,
@@ -285,10 +475,10 @@ class ConfigManager:
             if track_partial_deliveries is not None:
                 self.config['processing']['track_partial_deliveries'] = track_partial_deliveries
             
-            return self.save_config()
+            return self._save_or_defer()
             
         except Exception as e:
-            logging.error(f"Error updating processing configuration: {str(e)}")
+            logger.error("Error updating processing configuration: %s", e)
             return False
 
     def reset_to_defaults(self) -> bool:
@@ -299,60 +489,10 @@ class ConfigManager:
             bool: True if configuration was reset and saved successfully
         """
         try:
-            self.config = {
-                'monitoring': {
-                    'enabled': True,
-                    'check_interval': 5,
-                    'folders': {
-                        'offers': '',
-                        'invoices': ''
-                    }
-                },
-                'processing': {
-                    'price_tolerance': 0.02,
-                    'extraction_method': 'intelligent',
-                    'track_partial_deliveries': True
-                },
-                'notifications': {
-                    'slack': {
-                        'enabled': True,
-                        'webhook_url': '',
-                        'channel': '#pdf-comparison-alerts',
-                        'notify_on': {
-                            'price_discrepancies': True,
-                            'quantity_mismatches': True,
-                            'missing_items': True,
-                            'successful_comparisons': False
-                        },
-                        'thresholds': {
-                            'price_difference': 0.0,
-                            'quantity_difference': 0
-                        }
-                    }
-                },
-                'ui': {
-                    'theme': 'light',
-                    'window': {
-                        'width': 1024,
-                        'height': 768
-                    },
-                    'auto_refresh': True,
-                    'refresh_interval': 60
-                },
-                'database': {
-                    'path': 'data/comparison_history.db',
-                    'retention_days': 90
-                },
-                'logging': {
-                    'level': 'INFO',
-                    'file': 'logs/comparison_tool.log',
-                    'max_size': 10485760,
-                    'backup_count': 5
-                }
-            }
+            self.config = copy.deepcopy(DEFAULT_CONFIG)
             
-            return self.save_config()
+            return self._save_or_defer()
             
         except Exception as e:
-            logging.error(f"Error resetting configuration: {str(e)}")
+            logger.error("Error resetting configuration: %s", e)
             return False
@@ -1,22 +1,90 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Boolean
+from sqlalchemy import create_engine, event, text, Column, Integer, BigInteger, String, Float, JSON, Boolean
+from sqlalchemy import and_, bindparam, case, delete, func, insert, not_, select, type_coerce, update
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime, timedelta
+from decimal import Decimal
 import json
 import logging
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 
+# Pragmas applied to every new SQLite connection: WAL lets readers run
+# alongside the writer and, with synchronous=NORMAL, needs far fewer fsyncs
+# per commit than the default rollback journal
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+)
+
+# Bound parameters per bulk INSERT statement, within the 999 variable limit
+# of older SQLite builds
+BULK_INSERT_PARAMETERS = 999
+
+# Engines kept for reuse by later managers of the same database
+ENGINE_CACHE_SIZE = 16
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure a freshly opened SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+class EpochMicroseconds(TypeDecorator):
+    """Naive UTC datetime stored as integer microseconds since the epoch"""
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return (value - _EPOCH) // _MICROSECOND
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return _EPOCH + timedelta(microseconds=value)
+
+# Rewrites timestamps left as DateTime text ('YYYY-MM-DD HH:MM:SS.ffffff') by
+# databases created before they were stored as integers. SQLite orders every
+# TEXT value after every INTEGER, so the filter only matches legacy rows and
+# can use the timestamp index
+_MIGRATE_TEXT_TIMESTAMPS = text(
+    "UPDATE comparisons SET timestamp ="
+    " CAST(strftime('%s', timestamp) AS INTEGER) * 1000000"
+    " + CAST(substr(timestamp, 21, 6) AS INTEGER)"
+    " WHERE timestamp >= ''"
+)
+
 class ComparisonRecord(Base):
     """Model for storing comparison results"""
     __tablename__ = 'comparisons'
 
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(EpochMicroseconds, default=datetime.utcnow, index=True)
     offer_path = Column(String)
-    invoice_paths = Column(String)  # JSON array of paths
+    invoice_paths = Column(JSON)  # Array of paths
     status = Column(String)  # 'success', 'error'
     error_message = Column(String, nullable=True)
     
@@ -37,29 +105,192 @@ class ComparisonRecord(Base):
     notification_sent = Column(Boolean, default=False)
     notification_error = Column(String, nullable=True)
 
+# Statements for the per-call paths, built once at import. Bound parameters
+# keep their structure identical between calls, so SQLAlchemy's compiled
+# cache serves the SQL without recompiling
+_SUMMARY_FIELDS = (
+    'total_items',
+    'matches',
+    'quantity_mismatches',
+    'price_mismatches',
+    'missing_items',
+    'extra_items',
+    'total_quantity_difference',
+    'total_price_difference',
+)
+
+_HISTORY_COLUMNS = [
+    getattr(ComparisonRecord, name) for name in (
+        'id', 'offer_path', 'invoice_paths', 'status', 'error_message',
+        *_SUMMARY_FIELDS,
+        'notification_sent', 'notification_error'
+    )
+]
+
+# The stored integer microseconds, read without converting to a datetime
+_HISTORY_COLUMNS.append(
+    type_coerce(ComparisonRecord.timestamp, BigInteger).label('timestamp_us')
+)
+
+# Plain column selects skip ORM object materialization; the detailed
+# results are only projected when the caller asks for them
+_HISTORY_STATEMENT = (
+    select(*_HISTORY_COLUMNS, ComparisonRecord.results)
+    .order_by(ComparisonRecord.timestamp.desc())
+)
+
+_HISTORY_SUMMARY_STATEMENT = (
+    select(*_HISTORY_COLUMNS)
+    .order_by(ComparisonRecord.timestamp.desc())
+)
+
+_INSERT_STATEMENT = insert(ComparisonRecord)
+
+_CLEANUP_STATEMENT = (
+    delete(ComparisonRecord)
+    .where(ComparisonRecord.timestamp < bindparam('cutoff'))
+    .execution_options(synchronize_session=False)
+)
+
+_NOTIFY_STATEMENT = (
+    update(ComparisonRecord)
+    .where(ComparisonRecord.id == bindparam('rid'))
+    .values(notification_sent=bindparam('sent'), notification_error=bindparam('err'))
+    .execution_options(synchronize_session=False)
+)
+
+def _json_default(obj):
+    """Encode values the json module cannot, such as Decimal amounts"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def _json_serializer(value):
+        """Serializer used by the engine for JSON columns"""
+        return orjson.dumps(value, default=_json_default).decode()
+    
+    _json_deserializer = orjson.loads
+else:
+    def _json_serializer(value):
+        """Serializer used by the engine for JSON columns"""
+        return json.dumps(value, default=_json_default)
+    
+    _json_deserializer = json.loads
+
+def _comparison_values(offer_path: str,
+                       invoice_paths: List[str],
+                       status: str,
+                       summary: Dict,
+                       results: List[Dict],
+                       error_message: Optional[str] = None) -> Dict:
+    """Build the column values for one comparison record"""
+    # SQLite would silently store any type in the String column
+    if not isinstance(offer_path, str):
+        raise TypeError(f"offer_path must be a string, got {type(offer_path).__name__}")
+    
+    return {
+        'offer_path': offer_path,
+        'invoice_paths': invoice_paths,
+        'status': status,
+        'error_message': error_message,
+        
+        # Summary statistics
+        'total_items': summary.get('total_items', 0),
+        'matches': summary.get('matches', 0),
+        'quantity_mismatches': summary.get('quantity_mismatches', 0),
+        'price_mismatches': summary.get('price_mismatches', 0),
+        'missing_items': summary.get('missing_items', 0),
+        'extra_items': summary.get('extra_items', 0),
+        'total_quantity_difference': float(summary.get('total_quantity_difference', 0)),
+        'total_price_difference': float(summary.get('total_price_difference', 0)),
+        
+        # JSON column encodes the detailed results itself
+        'results': results
+    }
+
+def _create_engine(url: str, **options) -> Engine:
+    """Create an engine for url with the JSON serializers and pragmas"""
+    engine = create_engine(
+        url,
+        json_serializer=_json_serializer,
+        json_deserializer=_json_deserializer,
+        **options
+    )
+    event.listen(engine, 'connect', _apply_sqlite_pragmas)
+    return engine
+
+@lru_cache(maxsize=ENGINE_CACHE_SIZE)
+def _shared_engine(url: str) -> Engine:
+    """
+    Engine shared by every manager opening the same database URL
+    
+    Only the engine is cached; file databases use a NullPool, so it keeps
+    no connection to a file that is deleted or replaced later. The schema
+    is checked by every manager, see _prepare_schema.
+    """
+    return _create_engine(url)
+
+def _prepare_schema(engine: Engine):
+    """Bring the schema of the database behind engine up to date"""
+    Base.metadata.create_all(engine, checkfirst=True)
+    
+    # create_all skips tables that already exist, so add any indexes
+    # introduced after an existing database was created
+    for index in ComparisonRecord.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    
+    with engine.begin() as connection:
+        connection.execute(_MIGRATE_TEXT_TIMESTAMPS)
+
+def _total(expression):
+    """SUM() that yields 0 instead of NULL when no rows match"""
+    return func.coalesce(func.sum(expression), 0)
+
 class DatabaseManager:
     def __init__(self, db_path: str):
         """
         Initialize database manager
         
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to SQLite database file, ':memory:' for a private
+                in-memory database, or a full SQLAlchemy URL
         """
-        # Ensure directory exists
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        if db_path == ':memory:':
+            # Every connection would otherwise open its own empty database;
+            # share a single one across sessions and threads instead. Never
+            # cached, each manager gets a private database
+            self.engine = _create_engine(
+                'sqlite://',
+                poolclass=StaticPool,
+                connect_args={'check_same_thread': False}
+            )
+        elif '://' in db_path:
+            self.engine = _shared_engine(db_path)
+        else:
+            # Ensure directory exists
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.engine = _shared_engine(f'sqlite:///{db_path}')
         
-        # Create engine and tables
-        self.engine = create_engine(f'sqlite:///{db_path}')
-        Base.metadata.create_all(self.engine)
+        # Checked on every manager: a database file may have been deleted
+        # or replaced since the shared engine was created
+        _prepare_schema(self.engine)
         
-        # Create session factory
-        self.Session = sessionmaker(bind=self.engine)
+        # Create session factory; keep attributes loaded after commit so
+        # records can be read once their session has closed
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    @contextmanager
+    def bulk_session(self):
+        """
+        Open a session whose work is committed in a single transaction
         
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        SQLite syncs to disk on every commit, so grouping many inserts into
+        one block pays that cost once. The transaction is rolled back if
+        the block raises.
+        """
+        with self.Session() as session, session.begin():
+            yield session
 
     def store_comparison(self,
                         offer_path: str,
@@ -83,42 +314,60 @@ class DatabaseManager:
             int: ID of created record
         """
         try:
-            session = self.Session()
-            
-            record = ComparisonRecord(
-                offer_path=offer_path,
-                invoice_paths=json.dumps(invoice_paths),
-                status=status,
-                error_message=error_message,
-                
-                # Summary statistics
-                total_items=summary.get('total_items', 0),
-                matches=summary.get('matches', 0),
-                quantity_mismatches=summary.get('quantity_mismatches', 0),
-                price_mismatches=summary.get('price_mismatches', 0),
-                missing_items=summary.get('missing_items', 0),
-                extra_items=summary.get('extra_items', 0),
-                total_quantity_difference=float(summary.get('total_quantity_difference', 0)),
-                total_price_difference=float(summary.get('total_price_difference', 0)),
-                
-                # Store detailed results as JSON
-                results=json.dumps(results)
+            values = _comparison_values(
+                offer_path, invoice_paths, status, summary, results, error_message
             )
             
-            session.add(record)
-            session.commit()
+            # A Core insert skips the ORM unit of work for a row that is
+            # never read back as an object
+            with self.engine.begin() as connection:
+                result = connection.execute(_INSERT_STATEMENT, values)
             
-            record_id = record.id
-            session.close()
+            record_id = result.inserted_primary_key[0]
             
-            logging.info(f"Stored comparison record with ID {record_id}")
+            logger.info("Stored comparison record with ID %s", record_id)
             return record_id
             
         except Exception as e:
-            logging.error(f"Error storing comparison results: {str(e)}")
-            if session:
-                session.rollback()
-                session.close()
+            logger.error("Error storing comparison results: %s", e)
+            raise
+
+    def store_comparisons_bulk(self, records: List[Dict]) -> List[int]:
+        """
+        Store several comparison results in a single transaction
+        
+        Args:
+            records: Dictionaries with the keyword arguments of store_comparison
+            
+        Returns:
+            List[int]: IDs of created records, in input order
+        """
+        if not records:
+            return []
+        
+        try:
+            rows = [_comparison_values(**record) for record in records]
+            
+            # Keep each multi-row INSERT under SQLite's bound parameter limit;
+            # column defaults are bound per row as well
+            table = ComparisonRecord.__table__
+            chunk_size = max(1, BULK_INSERT_PARAMETERS // len(table.columns))
+            
+            record_ids = []
+            with self.engine.begin() as connection:
+                for start in range(0, len(rows), chunk_size):
+                    chunk = rows[start:start + chunk_size]
+                    result = connection.execute(insert(table).values(chunk))
+                    # SQLite assigns consecutive rowids within one statement
+                    # and reports the last of them
+                    last_id = result.lastrowid
+                    record_ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+            
+            logger.info("Stored %s comparison records", len(record_ids))
+            return record_ids
+            
+        except Exception as e:
+            logger.error("Error storing comparison results: %s", e)
             raise
 
     def update_notification_status(self,
@@ -137,87 +386,72 @@ class DatabaseManager:
             bool: True if update was successful
         """
         try:
-            session = self.Session()
-            
-            record = session.query(ComparisonRecord).get(record_id)
-            if record:
-                record.notification_sent = sent
-                record.notification_error = error
-                session.commit()
-                session.close()
-                return True
+            with self.Session() as session, session.begin():
+                updated = session.execute(
+                    _NOTIFY_STATEMENT, {'rid': record_id, 'sent': sent, 'err': error}
+                ).rowcount
             
-            session.close()
-            return False
+            return updated > 0
             
         except Exception as e:
-            logging.error(f"Error updating notification status: {str(e)}")
-            if session:
-                session.rollback()
-                session.close()
+            logger.error("Error updating notification status: %s", e)
             return False
 
     def get_comparison_history(self,
                              days: Optional[int] = None,
-                             limit: Optional[int] = None) -> List[Dict]:
+                             limit: Optional[int] = None,
+                             include_results: bool = True) -> List[Dict]:
         """
         Get comparison history
         
         Args:
             days: Optional number of days to look back
             limit: Optional maximum number of records to return
+            include_results: Whether to load the detailed per-item results;
+                when False the 'results' key is omitted from each record
             
         Returns:
             List of comparison records as dictionaries
         """
         try:
-            session = self.Session()
-            
-            query = session.query(ComparisonRecord)
-            
-            if days:
-                cutoff = datetime.utcnow() - timedelta(days=days)
-                query = query.filter(ComparisonRecord.timestamp >= cutoff)
-            
-            query = query.order_by(ComparisonRecord.timestamp.desc())
-            
-            if limit:
-                query = query.limit(limit)
-            
-            records = query.all()
-            
-            # Convert to dictionaries
-            results = []
-            for record in records:
-                results.append({
-                    'id': record.id,
-                    'timestamp': record.timestamp.isoformat(),
-                    'offer_path': record.offer_path,
-                    'invoice_paths': json.loads(record.invoice_paths),
-                    'status': record.status,
-                    'error_message': record.error_message,
-                    'summary': {
-                        'total_items': record.total_items,
-                        'matches': record.matches,
-                        'quantity_mismatches': record.quantity_mismatches,
-                        'price_mismatches': record.price_mismatches,
-                        'missing_items': record.missing_items,
-                        'extra_items': record.extra_items,
-                        'total_quantity_difference': record.total_quantity_difference,
-                        'total_price_difference': record.total_price_difference
-                    },
-                    'results': json.loads(record.results),
-                    'notification_sent': record.notification_sent,
-                    'notification_error': record.notification_error
-                })
+            with self.Session() as session:
+                if include_results:
+                    statement = _HISTORY_STATEMENT
+                else:
+                    statement = _HISTORY_SUMMARY_STATEMENT
+            
+                if days:
+                    cutoff = datetime.utcnow() - timedelta(days=days)
+                    statement = statement.where(ComparisonRecord.timestamp >= cutoff)
+            
+                if limit:
+                    statement = statement.limit(limit)
+            
+                # Convert to dictionaries
+                results = []
+                for row in session.execute(statement).mappings():
+                    timestamp_us = row['timestamp_us']
+                    record = {
+                        'id': row['id'],
+                        'timestamp': (_EPOCH + timedelta(microseconds=timestamp_us)).isoformat(),
+                        # Epoch milliseconds (UTC), for arithmetic without parsing
+                        'timestamp_ms': timestamp_us // 1000,
+                        'offer_path': row['offer_path'],
+                        'invoice_paths': row['invoice_paths'],
+                        'status': row['status'],
+                        'error_message': row['error_message'],
+                        'summary': {name: row[name] for name in _SUMMARY_FIELDS},
+                        'notification_sent': row['notification_sent'],
+                        'notification_error': row['notification_error']
+                    }
+                    if include_results:
+                        record['results'] = row['results']
+                    results.append(record)
             
-            session.close()
             return results
             
         except Exception as e:
-            logging.error(f"Error retrieving comparison history: {str(e)}")
-            if session:
-                session.close()
+            logger.error("Error retrieving comparison history: %s", e)
             return []
 
     def cleanup_old_records(self, days: int) -> int:
@@ -231,24 +465,17 @@ class DatabaseManager:
             int: Number of records deleted
         """
         try:
-            session = self.Session()
-            
             cutoff = datetime.utcnow() - timedelta(days=days)
-            deleted = session.query(ComparisonRecord)\
-                           .filter(ComparisonRecord.timestamp < cutoff)\
-                           .delete()
             
-            session.commit()
-            session.close()
+            # Bulk DELETE without loading or synchronizing ORM objects
+            with self.Session() as session, session.begin():
+                deleted = session.execute(_CLEANUP_STATEMENT, {'cutoff': cutoff}).rowcount
             
-            logging.info(f"Deleted {deleted} old comparison records")
+            logger.info("Deleted %s old comparison records", deleted)
             return deleted
             
         except Exception as e:
-            logging.error(f"Error cleaning up old records: {str(e)}")
-            if session:
-                session.rollback()
-                session.close()
+            logger.error("Error cleaning up old records: %s", e)
             return 0
 
     def get_statistics(self, days: Optional[int] = None) -> Dict:
@@ -262,59 +489,57 @@ class DatabaseManager:
             Dictionary with statistics
         """
         try:
-            session = self.Session()
-            
-            query = session.query(ComparisonRecord)
-            
-            if days:
-                cutoff = datetime.utcnow() - timedelta(days=days)
-                query = query.filter(ComparisonRecord.timestamp >= cutoff)
-            
-            records = query.all()
+            record = ComparisonRecord
+            notification_failed = and_(
+                not_(func.coalesce(record.notification_sent, False)),
+                func.coalesce(record.notification_error, '') != ''
+            )
             
-            stats = {
-                'total_comparisons': len(records),
-                'successful_comparisons': 0,
-                'failed_comparisons': 0,
-                'total_items_compared': 0,
-                'total_matches': 0,
-                'total_quantity_mismatches': 0,
-                'total_price_mismatches': 0,
-                'total_missing_items': 0,
-                'total_extra_items': 0,
-                'total_quantity_difference': 0,
-                'total_price_difference': 0,
+            # Aggregate in SQLite so no rows (or their JSON results) are loaded
+            with self.Session() as session:
+                query = session.query(
+                    func.count(record.id),
+                    _total(case((record.status == 'success', 1), else_=0)),
+                    _total(record.total_items),
+                    _total(record.matches),
+                    _total(record.quantity_mismatches),
+                    _total(record.price_mismatches),
+                    _total(record.missing_items),
+                    _total(record.extra_items),
+                    _total(record.total_quantity_difference),
+                    # Summed as whole cents so float drift does not build up
+                    # across many records
+                    _total(func.round(record.total_price_difference * 100)),
+                    _total(case((record.notification_sent, 1), else_=0)),
+                    _total(case((notification_failed, 1), else_=0))
+                )
+                
+                if days:
+                    cutoff = datetime.utcnow() - timedelta(days=days)
+                    query = query.filter(record.timestamp >= cutoff)
+                
+                (total, successful, items, matches, quantity_mismatches,
+                 price_mismatches, missing_items, extra_items, quantity_difference,
+                 price_difference, sent, failed) = query.one()
+            
+            return {
+                'total_comparisons': total,
+                'successful_comparisons': successful,
+                'failed_comparisons': total - successful,
+                'total_items_compared': items,
+                'total_matches': matches,
+                'total_quantity_mismatches': quantity_mismatches,
+                'total_price_mismatches': price_mismatches,
+                'total_missing_items': missing_items,
+                'total_extra_items': extra_items,
+                'total_quantity_difference': quantity_difference,
+                'total_price_difference': price_difference / 100,
                 'notifications': {
-                    'sent': 0,
-                    'failed': 0
+                    'sent': sent,
+                    'failed': failed
                 }
             }
             
-            for record in records:
-                if record.status == 'success':
-                    stats['successful_comparisons'] += 1
-                else:
-                    stats['failed_comparisons'] += 1
-                
-                stats['total_items_compared'] += record.total_items
-                stats['total_matches'] += record.matches
-                stats['total_quantity_mismatches'] += record.quantity_mismatches
-                stats['total_price_mismatches'] += record.price_mismatches
-                stats['total_missing_items'] += record.missing_items
-                stats['total_extra_items'] += record.extra_items
-                stats['total_quantity_difference'] += record.total_quantity_difference
-                stats['total_price_difference'] += record.total_price_difference
-                
-                if record.notification_sent:
-                    stats['notifications']['sent'] += 1
-                elif record.notification_error:
-                    stats['notifications']['failed'] += 1
-            
-            session.close()
-            return stats
-            
         except Exception as e:
-            logging.error(f"Error getting statistics: {str(e)}")
-            if session:
-                session.close()
+            logger.error("Error getting statistics: %s", e)
             return {}
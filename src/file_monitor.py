@@ -1,97 +1,340 @@
+import os
+import heapq
 import time
 from pathlib import Path
-from watchdog.observers import Observer
+from watchdog import observers
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
-from typing import Callable, Dict, Set
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+from types import MappingProxyType
 import logging
-from datetime import datetime, timedelta
-from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 import threading
 
+try:
+    from watchdog.observers.inotify import InotifyObserver
+except ImportError:
+    # inotify is Linux only
+    InotifyObserver = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds a processed PDF is remembered to suppress duplicate events
+PROCESSED_FILE_TTL = 300
+
+# Processed PDFs remembered at most; the oldest are forgotten first when a
+# burst of files arrives faster than the TTL expires them
+MAX_PROCESSED_FILES = 10_000
+
+# Seconds during which repeated events for the same file version are ignored
+DEBOUNCE_WINDOW = 2.0
+
+# Seconds between sweeps that forget expired processed PDFs
+PROCESSED_FILE_SWEEP_INTERVAL = 30
+
+# Seconds a PDF must stay unchanged before it is processed, when the
+# observer does not report files closed after writing
+SETTLE_DELAY = 1
+
+# Seconds an offer waits for matching invoices before it is dropped
+PENDING_OFFER_TTL = 24 * 3600
+
+# Upper bound on PDFs a handler processes concurrently by default
+MAX_PROCESSING_WORKERS = 8
+
+# Network filesystems do not deliver inotify events for remote changes,
+# so folders on them are polled instead
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'fuse.sshfs', '9p'}
+
+def _is_pdf(path: str) -> bool:
+    """Check for a .pdf extension in any case without lowercasing the whole path"""
+    return path[-4:].lower() == '.pdf'
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return the (st_mtime_ns, st_size) of a file, None if it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _filesystem_type(path: str) -> Optional[str]:
+    """Return the type of the filesystem holding path, if it can be determined"""
+    try:
+        with open('/proc/self/mounts') as mounts:
+            path = os.path.realpath(path)
+            best_mount, fs_type = '', None
+            for line in mounts:
+                fields = line.split()
+                # Spaces in mount points are escaped as octal
+                mount_point = fields[1].replace('\\040', ' ')
+                prefix = mount_point.rstrip('/') + '/'
+                if ((path == mount_point or path.startswith(prefix)) and
+                        len(mount_point) > len(best_mount)):
+                    best_mount, fs_type = mount_point, fields[2]
+            return fs_type
+    except (OSError, IndexError):
+        # Not Linux, or an unexpected mounts format
+        return None
+
 class PDFEventHandler(FileSystemEventHandler):
-    def __init__(self, callback: Callable[[str], None], file_type: str):
+    def __init__(self,
+                 callback: Callable[[str], None],
+                 file_type: str,
+                 close_events: bool = False,
+                 max_workers: Optional[int] = None):
         """
         Initialize the event handler
         
         Args:
             callback: Function to call when a PDF is detected
             file_type: Type of files to monitor ('offer' or 'invoice')
+            close_events: Whether the observer reports files closed after
+                writing; if so only those are handled and no settling
+                wait is needed
+            max_workers: Maximum number of PDFs processed concurrently,
+                defaults to the CPU count capped at MAX_PROCESSING_WORKERS
         """
         self.callback = callback
         self.file_type = file_type
-        self.processed_files: Set[str] = set()
-        self.processing_queue = Queue()
-        self.start_processing_thread()
+        self.close_events = close_events
+        # Path -> time.monotonic() when it was submitted, oldest first
+        self.processed_files: Dict[str, float] = {}
+        # (path, st_mtime_ns) -> time.monotonic() of its last close event
+        self._last_seen: Dict[Tuple[str, int], float] = {}
+        # Path -> (time.monotonic() deadline, (st_mtime_ns, st_size)) of
+        # PDFs waiting to stop changing, without close events
+        self._settling: Dict[str, Tuple[float, Tuple[int, int]]] = {}
+        # Guards _settling and wakes the settle thread
+        self._settling_changed = threading.Condition()
+        if max_workers is None:
+            max_workers = min(MAX_PROCESSING_WORKERS, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix=f'{file_type}-pdf')
+        self._stopped = threading.Event()
+        # Set whenever no submitted PDF is waiting or being processed
+        self._idle = threading.Event()
+        self._idle.set()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.start_sweeper_thread()
+        if not close_events:
+            self.start_settle_thread()
 
-    def on_created(self, event):
+    def on_closed(self, event):
+        # Only reported by inotify, once the writer has closed the file
         if event.is_directory:
             return
-        if event.src_path.lower().endswith('.pdf'):
+        if _is_pdf(event.src_path):
+            self._handle_pdf(event.src_path)
+
+    def on_moved(self, event):
+        # Files renamed into the folder arrive complete; dest_path is None
+        # for files moved out of it
+        if event.is_directory or not event.dest_path:
+            return
+        if _is_pdf(event.dest_path):
+            self._handle_pdf(event.dest_path)
+
+    def on_created(self, event):
+        if event.is_directory or self.close_events:
+            return
+        if _is_pdf(event.src_path):
             self._handle_pdf(event.src_path)
 
     def on_modified(self, event):
-        if event.is_directory:
+        # Without close events a re-saved file only shows up as modified
+        if event.is_directory or self.close_events:
             return
-        if event.src_path.lower().endswith('.pdf'):
+        if _is_pdf(event.src_path):
             self._handle_pdf(event.src_path)
 
     def _handle_pdf(self, file_path: str):
-        """Queue the PDF for processing if it hasn't been processed recently"""
-        if file_path not in self.processed_files:
-            self.processing_queue.put(file_path)
-            self.processed_files.add(file_path)
+        """Submit the PDF for processing once it is completely written"""
+        if self._stopped.is_set():
+            # The executor no longer accepts work
+            return
+        
+        if not self.close_events:
+            self._settle(file_path)
+            return
+        
+        try:
+            # A re-saved file gets a new mtime and is processed again
+            key = (file_path, os.stat(file_path).st_mtime_ns)
+        except OSError:
+            # Already gone again
+            return
+        
+        now = time.monotonic()
+        if now - self._last_seen.get(key, float('-inf')) < DEBOUNCE_WINDOW:
+            return
+        self._last_seen[key] = now
+        
+        self._remember(file_path)
+        self._begin_work()
+        self._submit(file_path)
 
-    def start_processing_thread(self):
-        """Start a thread to process PDFs from the queue"""
-        def process_queue():
-            while True:
-                try:
-                    # Get file path from queue with timeout
-                    file_path = self.processing_queue.get(timeout=1)
-                    
-                    # Wait briefly to ensure file is completely written
-                    time.sleep(1)
-                    
-                    # Process the file
-                    try:
-                        self.callback(file_path)
-                        logging.info(f"Processed {self.file_type} PDF: {file_path}")
-                    except Exception as e:
-                        logging.error(f"Error processing {file_path}: {str(e)}")
-                    
-                    # Remove from processed files after some time
-                    threading.Timer(
-                        300,  # 5 minutes
-                        lambda f: self.processed_files.discard(f),
-                        args=[file_path]
-                    ).start()
+    def _settle(self, file_path: str):
+        """
+        (Re)start the wait for a PDF to stop changing
+        
+        Copies and saves report a created event and several modified ones,
+        each with a new mtime. Every event pushes the PDF's deadline back,
+        so the settle thread submits it once, SETTLE_DELAY after the last
+        change.
+        """
+        signature = _file_signature(file_path)
+        if signature is None:
+            # Already gone again
+            return
+        
+        with self._settling_changed:
+            if self._stopped.is_set():
+                # stop() has already dropped the settling PDFs
+                return
+            if file_path not in self._settling:
+                # Counted until processed, so wait_until_idle covers the wait
+                self._remember(file_path)
+                self._begin_work()
+                # Deadlines only move later, so only new PDFs can be due
+                # before the settle thread wakes up
+                self._settling_changed.notify()
+            self._settling[file_path] = (time.monotonic() + SETTLE_DELAY, signature)
+
+    def start_settle_thread(self):
+        """Start the thread that submits settling PDFs once they stop changing"""
+        def settle():
+            with self._settling_changed:
+                while not self._stopped.is_set():
+                    now = time.monotonic()
+                    next_deadline = None
+                    # Snapshot, entries are removed while iterating
+                    for file_path, (deadline, signature) in list(self._settling.items()):
+                        if deadline <= now:
+                            current = _file_signature(file_path)
+                            if current is None:
+                                # Deleted before it settled
+                                del self._settling[file_path]
+                                self._end_work()
+                                continue
+                            if current == signature:
+                                del self._settling[file_path]
+                                self._submit(file_path)
+                                continue
+                            # Still being written, e.g. between two polls
+                            # that the observer has not reported yet
+                            deadline = now + SETTLE_DELAY
+                            self._settling[file_path] = (deadline, current)
+                        
+                        if next_deadline is None or deadline < next_deadline:
+                            next_deadline = deadline
                     
-                except Queue.Empty:
-                    continue
-                except Exception as e:
-                    logging.error(f"Error in processing thread: {str(e)}")
-                    time.sleep(1)
+                    self._settling_changed.wait(
+                        None if next_deadline is None else next_deadline - now
+                    )
 
-        thread = threading.Thread(target=process_queue, daemon=True)
+        thread = threading.Thread(target=settle, daemon=True)
         thread.start()
 
+    def _remember(self, file_path: str):
+        """Record the PDF as submitted now, forgetting the oldest beyond the limit"""
+        # Re-insert so the dict stays ordered by submission time
+        self.processed_files.pop(file_path, None)
+        self.processed_files[file_path] = time.monotonic()
+        if len(self.processed_files) > MAX_PROCESSED_FILES:
+            self.processed_files.pop(next(iter(self.processed_files)), None)
+
+    def _submit(self, file_path: str):
+        """Hand a PDF counted by _begin_work to the executor"""
+        try:
+            self.executor.submit(self._process_pdf, file_path)
+        except RuntimeError:
+            # stop() shut the executor down since _stopped was checked
+            self._end_work()
+
+    def _process_pdf(self, file_path: str):
+        """Run the callback for a PDF on one of the executor's threads"""
+        try:
+            self.callback(file_path)
+            logger.info("Processed %s PDF: %s", self.file_type, file_path)
+        except Exception as e:
+            logger.error("Error processing %s: %s", file_path, e)
+        finally:
+            self._end_work()
+
+    def _begin_work(self):
+        """Count a PDF as waiting or being processed"""
+        with self._in_flight_lock:
+            self._in_flight += 1
+            self._idle.clear()
+
+    def _end_work(self):
+        """Count a PDF as done, waking wait_until_idle after the last one"""
+        with self._in_flight_lock:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every submitted PDF has been processed
+        
+        Args:
+            timeout: Maximum number of seconds to wait, None to wait forever
+            
+        Returns:
+            bool: False if the timeout expired first
+        """
+        return self._idle.wait(timeout)
+
+    def start_sweeper_thread(self):
+        """Start a thread that forgets processed PDFs once their TTL expires"""
+        def sweep():
+            while not self._stopped.wait(PROCESSED_FILE_SWEEP_INTERVAL):
+                now = time.monotonic()
+                # Snapshot first, _handle_pdf may add entries meanwhile
+                cutoff = now - PROCESSED_FILE_TTL
+                for file_path, submitted_at in list(self.processed_files.items()):
+                    if submitted_at < cutoff:
+                        self.processed_files.pop(file_path, None)
+                
+                cutoff = now - DEBOUNCE_WINDOW
+                for key, seen_at in list(self._last_seen.items()):
+                    if seen_at < cutoff:
+                        self._last_seen.pop(key, None)
+
+        thread = threading.Thread(target=sweep, daemon=True)
+        thread.start()
+
+    def stop(self):
+        """Stop the processing, sweeper and settle threads"""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            
+            # PDFs still settling are dropped, those submitted are still
+            # processed
+            with self._settling_changed:
+                for _ in range(len(self._settling)):
+                    self._end_work()
+                self._settling.clear()
+                self._settling_changed.notify()
+            self.executor.shutdown(wait=False)
+
 class FolderMonitor:
     def __init__(self):
-        self.observer = Observer()
+        # Created by start_monitoring once the watched filesystems are known
+        self.observer = None
         self.handlers: Dict[str, PDFEventHandler] = {}
         self.monitoring = False
-        
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
 
     def start_monitoring(self, 
                         offers_path: str, 
                         invoices_path: str,
                         offer_callback: Callable[[str], None],
-                        invoice_callback: Callable[[str], None]):
+                        invoice_callback: Callable[[str], None],
+                        poll_interval: float = 5,
+                        max_workers: Optional[int] = None):
         """
         Start monitoring folders for PDF changes
         
@@ -100,11 +343,29 @@ class FolderMonitor:
             invoices_path: Path to folder containing invoice PDFs
             offer_callback: Function to call when new offer PDF is detected
             invoice_callback: Function to call when new invoice PDF is detected
+            poll_interval: Seconds between scans when a folder is on a
+                network filesystem and has to be polled
+            max_workers: Maximum number of PDFs of each type processed
+                concurrently, see PDFEventHandler
         """
         try:
+            if any(_filesystem_type(path) in NETWORK_FILESYSTEMS
+                   for path in (offers_path, invoices_path)):
+                self.observer = PollingObserver(timeout=poll_interval)
+            elif InotifyObserver is not None and observers.Observer is InotifyObserver:
+                # Full events report files moved in from unwatched folders as
+                # moves rather than creations, which close_events mode ignores
+                self.observer = InotifyObserver(generate_full_events=True)
+            else:
+                self.observer = observers.Observer()
+            
+            # inotify reports IN_CLOSE_WRITE, so writes need no settling wait
+            close_events = (InotifyObserver is not None and
+                            isinstance(self.observer, InotifyObserver))
+            
             # Create handlers for offers and invoices
-            offer_handler = PDFEventHandler(offer_callback, 'offer')
-            invoice_handler = PDFEventHandler(invoice_callback, 'invoice')
+            offer_handler = PDFEventHandler(offer_callback, 'offer', close_events, max_workers)
+            invoice_handler = PDFEventHandler(invoice_callback, 'invoice', close_events, max_workers)
             
             # Store handlers
             self.handlers['offer'] = offer_handler
@@ -118,12 +379,12 @@ class FolderMonitor:
             self.observer.start()
             self.monitoring = True
             
-            logging.info(f"Started monitoring folders:")
-            logging.info(f"Offers: {offers_path}")
-            logging.info(f"Invoices: {invoices_path}")
+            logger.info("Started monitoring folders:")
+            logger.info("Offers: %s", offers_path)
+            logger.info("Invoices: %s", invoices_path)
             
         except Exception as e:
-            logging.error(f"Error starting folder monitoring: {str(e)}")
+            logger.error("Error starting folder monitoring: %s", e)
             self.stop_monitoring()
             raise
 
@@ -134,19 +395,29 @@ class FolderMonitor:
                 self.observer.stop()
                 self.observer.join()
                 self.monitoring = False
-                logging.info("Stopped folder monitoring")
+                logger.info("Stopped folder monitoring")
+            
+            # Also reached when start_monitoring fails part way
+            for handler in self.handlers.values():
+                handler.stop()
         except Exception as e:
-            logging.error(f"Error stopping folder monitoring: {str(e)}")
+            logger.error("Error stopping folder monitoring: %s", e)
 
     def is_monitoring(self) -> bool:
         """Check if monitoring is active"""
         return self.monitoring
 
-    def get_monitored_files(self) -> Dict[str, Set[str]]:
-        """Get list of currently monitored files"""
+    def get_monitored_files(self) -> Dict[str, Mapping[str, float]]:
+        """
+        Get recently processed files
+        
+        Returns:
+            Read-only live views mapping each path to the time.monotonic()
+            it was submitted; copy them to keep a snapshot
+        """
         return {
-            'offers': self.handlers['offer'].processed_files.copy(),
-            'invoices': self.handlers['invoice'].processed_files.copy()
+            'offers': MappingProxyType(self.handlers['offer'].processed_files),
+            'invoices': MappingProxyType(self.handlers['invoice'].processed_files)
         }
 
 class AutoProcessor:
@@ -162,52 +433,84 @@ class AutoProcessor:
         """
         self.monitor = monitor
         self.comparison_callback = comparison_callback
-        self.pending_offers: Dict[str, datetime] = {}
-        self.processing_lock = threading.Lock()
+        # Offer path -> time.monotonic() when it was detected
+        self.pending_offers: Dict[str, float] = {}
+        # (expiry time, offer path), earliest first; a re-detected offer
+        # leaves its older entry behind, which is skipped when it comes up
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # Guards the heap only, invoices read pending_offers without it
+        self.processing_lock = threading.RLock()
+        self._expiry_condition = threading.Condition(self.processing_lock)
         
         # Start the processing thread
         self.start_processing_thread()
 
     def handle_offer(self, offer_path: str):
         """Handle new offer PDF"""
-        with self.processing_lock:
-            self.pending_offers[offer_path] = datetime.now()
+        now = time.monotonic()
+        self.pending_offers[offer_path] = now
+        
+        with self._expiry_condition:
+            heapq.heappush(self._expiry_heap, (now + PENDING_OFFER_TTL, offer_path))
+            # Every offer gets the same TTL, so only an empty heap can
+            # leave the cleanup thread waiting past this expiry
+            if len(self._expiry_heap) == 1:
+                self._expiry_condition.notify()
 
     def handle_invoice(self, invoice_path: str):
         """Handle new invoice PDF"""
-        with self.processing_lock:
-            # Get all pending offers
-            current_offers = self.pending_offers.copy()
+        # Snapshot the pending offers, copying the keys is a single atomic
+        # operation so offers may keep arriving meanwhile
+        current_offers = tuple(self.pending_offers)
+        
+        # Process each pending offer with this invoice
+        for offer_path in current_offers:
+            try:
+                self.comparison_callback(offer_path, [invoice_path])
+                logger.info("Compared offer %s with invoice %s", offer_path, invoice_path)
+            except Exception as e:
+                logger.error("Error comparing %s with %s: %s", offer_path, invoice_path, e)
+
+    def remove_expired_offers(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Remove pending offers whose TTL has expired
+        
+        Args:
+            now: time.monotonic() value to expire against, defaults to now
             
-            # Process each pending offer with this invoice
-            for offer_path, timestamp in current_offers.items():
-                try:
-                    self.comparison_callback(offer_path, [invoice_path])
-                    logging.info(f"Compared offer {offer_path} with invoice {invoice_path}")
-                except Exception as e:
-                    logging.error(f"Error comparing {offer_path} with {invoice_path}: {str(e)}")
+        Returns:
+            Seconds until the next offer expires, or None if none are pending
+        """
+        with self._expiry_condition:
+            if now is None:
+                now = time.monotonic()
+            
+            while self._expiry_heap:
+                expires_at, path = self._expiry_heap[0]
+                if expires_at > now:
+                    return expires_at - now
+                
+                heapq.heappop(self._expiry_heap)
+                # Keep offers that were re-detected since this entry
+                detected_at = self.pending_offers.get(path)
+                if detected_at is not None and detected_at + PENDING_OFFER_TTL <= now:
+                    self.pending_offers.pop(path, None)
+                    logger.info("Removed expired offer: %s", path)
+            
+            return None
 
     def start_processing_thread(self):
         """Start thread to clean up old pending offers"""
         def cleanup_pending():
             while True:
                 try:
-                    with self.processing_lock:
-                        current_time = datetime.now()
-                        # Remove offers older than 24 hours
-                        expired = [
-                            path for path, timestamp in self.pending_offers.items()
-                            if current_time - timestamp > timedelta(hours=24)
-                        ]
-                        for path in expired:
-                            del self.pending_offers[path]
-                            logging.info(f"Removed expired offer: {path}")
-                    
-                    # Sleep for 1 hour before next cleanup
-                    time.sleep(3600)
+                    with self._expiry_condition:
+                        # Sleep until the earliest offer expires, or until
+                        # the first offer arrives
+                        self._expiry_condition.wait(self.remove_expired_offers())
                     
                 except Exception as e:
-                    logging.error(f"Error in cleanup thread: {str(e)}")
+                    logger.error("Error in cleanup thread: %s", e)
                     time.sleep(60)
 
         thread = threading.Thread(target=cleanup_pending, daemon=True)
@@ -1,4 +1,5 @@
 import sys
+import logging
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QFileDialog, 
                             QCheckBox, QProgressBar)
@@ -205,8 +206,14 @@ class SettingsDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
         save_btn.clicked.connect(self.accept)
 
-def main():
-    app = QApplication(sys.argv)
+def main(argv=None):
+    # Library modules only use named loggers; configure output once here
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
+    app = QApplication(sys.argv if argv is None else argv)
     
     # Set application style
     app.setStyleSheet("""
@@ -233,7 +240,7 @@ def main():
     window = PDFComparisonTool()
     window.show()
     
-    sys.exit(app.exec())
+    return app.exec()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,10 +1,149 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import json
+import os
 import requests
 import logging
+import threading
+import time
 from dataclasses import dataclass
+from functools import partial
+from itertools import islice
 from decimal import Decimal
 from datetime import datetime
+from queue import Queue, Empty
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds the background sender waits for further messages to merge
+COALESCE_WINDOW = 0.2
+
+# Messages merged into a single Slack post at most
+MAX_COALESCED_MESSAGES = 5
+
+# Slack rejects messages with more blocks than this
+MAX_BLOCKS_PER_MESSAGE = 50
+
+# Statuses listed in the discrepancy details
+_DISCREPANCY_STATUSES = frozenset({'quantity_mismatch', 'price_mismatch', 'missing', 'extra_item'})
+
+# Discrepancies listed per message; the remaining blocks are taken by the
+# header, files, summary, dividers, timestamp and the omission note
+MAX_DISCREPANCY_BLOCKS = MAX_BLOCKS_PER_MESSAGE - 7
+
+# Queued in place of a message to shut the background sender down
+_STOP = None
+
+# Blocks that never change, shared by every message instead of rebuilt
+_HEADER_BLOCK = {
+    "type": "header",
+    "text": {
+        "type": "plain_text",
+        "text": "📊 PDF Comparison Results"
+    }
+}
+
+_DISCREPANCY_HEADER_BLOCK = {
+    "type": "header",
+    "text": {
+        "type": "plain_text",
+        "text": "📝 Detailed Discrepancies"
+    }
+}
+
+_ERROR_HEADER_BLOCK = {
+    "type": "header",
+    "text": {
+        "type": "plain_text",
+        "text": "❌ Error Alert"
+    }
+}
+
+_DIVIDER_BLOCK = {"type": "divider"}
+
+def _create_session() -> requests.Session:
+    """Create the HTTP session shared by all notifiers"""
+    session = requests.Session()
+    session.headers['Content-Type'] = 'application/json; charset=utf-8'
+    
+    # Webhook posts are not idempotent, so only retry, with backoff, when
+    # the message was certainly not accepted: failed connections and rate
+    # limits. Read errors and 5xx responses may follow a delivered post
+    session.mount('https://', HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=(429,),
+            allowed_methods=frozenset({'POST'})
+        )
+    ))
+    return session
+
+_SLACK_SESSION = _create_session()
+
+def _encode_json(payload: Dict) -> bytes:
+    """Encode a request body as compact UTF-8, with orjson when it is installed"""
+    # Amounts that reach the payload unformatted are sent as their exact
+    # decimal text
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    # Emoji and umlauts go out as UTF-8 instead of \uXXXX escapes
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'),
+                      default=str).encode('utf-8')
+
+# Discrepancy text per result status, each built with a single f-string
+def _format_quantity_mismatch(result: Dict) -> str:
+    return (
+        f"🔢 *{result['item_code']}*\n"
+        f"_{result['description']}_\n"
+        f"• Offered: {result['offer_quantity']}\n"
+        f"• Delivered: {result['delivered_quantity']}\n"
+        f"• Difference: {abs(result['quantity_difference'])}\n"
+    )
+
+def _format_price_mismatch(result: Dict) -> str:
+    return (
+        f"💰 *{result['item_code']}*\n"
+        f"_{result['description']}_\n"
+        f"• Offered Price: €{result['offer_price']:,.2f}\n"
+        f"• Invoiced Price: €{result['invoiced_price']:,.2f}\n"
+        f"• Difference: €{abs(result['price_difference']):,.2f}\n"
+    )
+
+def _format_missing(result: Dict) -> str:
+    return (
+        f"❌ *{result['item_code']}*\n"
+        f"_{result['description']}_\n"
+        f"• Missing from Invoices\n"
+        f"• Expected Quantity: {result['offer_quantity']}\n"
+    )
+
+def _format_extra_item(result: Dict) -> str:
+    return (
+        f"➕ *{result['item_code']}*\n"
+        f"_{result['description']}_\n"
+        f"• Not in Original Offer\n"
+        f"• Delivered Quantity: {result['delivered_quantity']}\n"
+    )
+
+def _format_other_discrepancy(result: Dict) -> str:
+    return f"❓ *{result['item_code']}*\n_{result['description']}_\n"
+
+_DISCREPANCY_FORMATTERS = {
+    'quantity_mismatch': _format_quantity_mismatch,
+    'price_mismatch': _format_price_mismatch,
+    'missing': _format_missing,
+    'extra_item': _format_extra_item,
+}
 
 @dataclass
 class NotificationConfig:
@@ -18,22 +157,54 @@ class NotificationConfig:
     price_threshold: Decimal = Decimal('0.0')  # Minimum price difference to trigger notification
     quantity_threshold: int = 0  # Minimum quantity difference to trigger notification
 
+    def __setattr__(self, name, value):
+        # Any change to the flags or thresholds invalidates the trigger table
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_triggers', None)
+
+    @property
+    def triggers(self) -> Tuple[Tuple[str, Optional[str], object], ...]:
+        """
+        Enabled discrepancy triggers, in the order they are checked
+        
+        Each entry is (count key, total key, threshold) for summary
+        dictionaries. A falsy threshold is always met, so its total is not
+        compared.
+        """
+        if self._triggers is None:
+            triggers = []
+            if self.notify_missing_items:
+                triggers.append(('missing_items', None, 0))
+            if self.notify_quantity_mismatches:
+                triggers.append(('quantity_mismatches', 'total_quantity_difference', self.quantity_threshold))
+            if self.notify_price_discrepancies:
+                triggers.append(('price_mismatches', 'total_price_difference', self.price_threshold))
+            object.__setattr__(self, '_triggers', tuple(triggers))
+        return self._triggers
+
 class SlackNotifier:
-    def __init__(self, config: NotificationConfig):
+    def __init__(self, config: NotificationConfig, background: bool = False):
         """
         Initialize the Slack notifier
         
         Args:
             config: NotificationConfig instance with Slack settings
+            background: Build and post messages on a background thread
+                instead of the caller's; send methods then return True once
+                the message is queued, and delivery failures are only
+                logged. Arguments must not be modified after sending.
         """
         self.config = config
-        self.session = requests.Session()
+        # Shared so every notifier reuses the same keep-alive connections
+        self.session = _SLACK_SESSION
         
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        # Holds functions that build each message's blocks
+        self._send_queue: Optional[Queue] = None
+        self._send_thread: Optional[threading.Thread] = None
+        if background:
+            self._send_queue = Queue()
+            self._send_thread = threading.Thread(target=self._send_worker, daemon=True)
+            self._send_thread.start()
 
     def send_comparison_results(self, 
                               offer_path: str, 
@@ -57,50 +228,42 @@ class SlackNotifier:
             should_notify = self._should_send_notification(summary)
             
             if not should_notify:
-                logging.info("No notification needed based on current configuration")
+                logger.info("No notification needed based on current configuration")
+                return True
+            
+            if self._send_queue is not None:
+                # The blocks are built by the sender so formatting large
+                # comparisons does not hold up the caller either
+                self._send_queue.put(partial(
+                    self._create_message_blocks, offer_path, invoice_paths, results, summary
+                ))
                 return True
 
             # Create message blocks
             blocks = self._create_message_blocks(offer_path, invoice_paths, results, summary)
             
             # Send message to Slack
-            response = self.session.post(
-                self.config.webhook_url,
-                json={
-                    "channel": self.config.channel,
-                    "blocks": blocks
-                }
-            )
+            response = self._post(blocks)
             
             if response.status_code != 200:
-                logging.error(f"Error sending Slack notification: {response.text}")
+                logger.error("Error sending Slack notification: %s", response.text)
                 return False
                 
-            logging.info("Successfully sent comparison results to Slack")
+            logger.info("Successfully sent comparison results to Slack")
             return True
             
         except Exception as e:
-            logging.error(f"Error sending comparison results to Slack: {str(e)}")
+            logger.error("Error sending comparison results to Slack: %s", e)
             return False
 
     def _should_send_notification(self, summary: Dict) -> bool:
         """Determine if a notification should be sent based on the results and configuration"""
         
-        # Always notify for missing items if enabled
-        if self.config.notify_missing_items and summary['missing_items'] > 0:
-            return True
-            
-        # Check quantity mismatches
-        if (self.config.notify_quantity_mismatches and 
-            summary['quantity_mismatches'] > 0 and 
-            summary['total_quantity_difference'] >= self.config.quantity_threshold):
-            return True
-            
-        # Check price discrepancies
-        if (self.config.notify_price_discrepancies and 
-            summary['price_mismatches'] > 0 and 
-            summary['total_price_difference'] >= self.config.price_threshold):
-            return True
+        # Only enabled categories are checked; totals are sums of absolute
+        # differences, so a zero threshold skips the Decimal comparison
+        for count_key, total_key, threshold in self.config.triggers:
+            if summary[count_key] > 0 and (not threshold or summary[total_key] >= threshold):
+                return True
             
         # Notify for successful comparisons if enabled
         if (self.config.notify_successful_comparisons and 
@@ -119,13 +282,7 @@ class SlackNotifier:
         blocks = []
         
         # Header section
-        blocks.append({
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": "📊 PDF Comparison Results"
-            }
-        })
+        blocks.append(_HEADER_BLOCK)
         
         # Files section
         files_text = f"*Offer:* {self._format_path(offer_path)}\n"
@@ -152,7 +309,7 @@ class SlackNotifier:
         })
         
         # Add divider
-        blocks.append({"type": "divider"})
+        blocks.append(_DIVIDER_BLOCK)
         
         # Details section for discrepancies
         if summary['quantity_mismatches'] > 0 or summary['price_mismatches'] > 0:
@@ -174,88 +331,70 @@ class SlackNotifier:
         
         status_emoji = "✅" if summary['matches'] == summary['total_items'] else "⚠️"
         
-        text = f"{status_emoji} *Summary*\n"
-        text += f"• Total Items: {summary['total_items']}\n"
-        text += f"• Matches: {summary['matches']}\n"
+        lines = [
+            f"{status_emoji} *Summary*",
+            f"• Total Items: {summary['total_items']}",
+            f"• Matches: {summary['matches']}"
+        ]
         
         if summary['quantity_mismatches'] > 0:
-            text += f"• Quantity Mismatches: {summary['quantity_mismatches']}\n"
-            text += f"  Total Quantity Difference: {summary['total_quantity_difference']}\n"
+            lines.append(f"• Quantity Mismatches: {summary['quantity_mismatches']}")
+            lines.append(f"  Total Quantity Difference: {summary['total_quantity_difference']}")
             
         if summary['price_mismatches'] > 0:
-            text += f"• Price Mismatches: {summary['price_mismatches']}\n"
-            text += f"  Total Price Difference: {self._format_currency(summary['total_price_difference'])}\n"
+            lines.append(f"• Price Mismatches: {summary['price_mismatches']}")
+            lines.append(f"  Total Price Difference: {self._format_currency(summary['total_price_difference'])}")
             
         if summary['missing_items'] > 0:
-            text += f"• Missing Items: {summary['missing_items']}\n"
+            lines.append(f"• Missing Items: {summary['missing_items']}")
             
         if summary['extra_items'] > 0:
-            text += f"• Extra Items: {summary['extra_items']}\n"
+            lines.append(f"• Extra Items: {summary['extra_items']}")
             
-        return text
+        return "\n".join(lines) + "\n"
 
     def _create_discrepancy_blocks(self, results: List[Dict]) -> List[Dict]:
         """Create formatted blocks for discrepancies"""
         
-        blocks = []
+        # One pass picks the discrepancies, stopping once one more than fits
+        # has been seen so the omission note knows whether it is needed
+        discrepancies = list(islice(
+            (result for result in results if result['status'] in _DISCREPANCY_STATUSES),
+            MAX_DISCREPANCY_BLOCKS + 1
+        ))
         
-        blocks.append({
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": "📝 Detailed Discrepancies"
+        # Every discrepancy status has a formatter, so skip the fallback lookup
+        blocks = [_DISCREPANCY_HEADER_BLOCK]
+        blocks.extend(
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": _DISCREPANCY_FORMATTERS[result['status']](result)
+                }
             }
-        })
+            for result in discrepancies[:MAX_DISCREPANCY_BLOCKS]
+        )
         
-        for result in results:
-            if result['status'] in ['quantity_mismatch', 'price_mismatch', 'missing', 'extra_item']:
-                text = self._format_discrepancy(result)
-                blocks.append({
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": text
-                    }
-                })
+        if len(discrepancies) > MAX_DISCREPANCY_BLOCKS:
+            blocks.append({
+                "type": "context",
+                "elements": [{
+                    "type": "mrkdwn",
+                    "text": f"Only the first {MAX_DISCREPANCY_BLOCKS} discrepancies are shown"
+                }]
+            })
         
         return blocks
 
     def _format_discrepancy(self, result: Dict) -> str:
         """Format a single discrepancy for display"""
-        
-        status_emoji = {
-            'quantity_mismatch': '🔢',
-            'price_mismatch': '💰',
-            'missing': '❌',
-            'extra_item': '➕'
-        }.get(result['status'], '❓')
-        
-        text = f"{status_emoji} *{result['item_code']}*\n"
-        text += f"_{result['description']}_\n"
-        
-        if result['status'] == 'quantity_mismatch':
-            text += f"• Offered: {result['offer_quantity']}\n"
-            text += f"• Delivered: {result['delivered_quantity']}\n"
-            text += f"• Difference: {abs(result['quantity_difference'])}\n"
-            
-        elif result['status'] == 'price_mismatch':
-            text += f"• Offered Price: {self._format_currency(result['offer_price'])}\n"
-            text += f"• Invoiced Price: {self._format_currency(result['invoiced_price'])}\n"
-            text += f"• Difference: {self._format_currency(abs(result['price_difference']))}\n"
-            
-        elif result['status'] == 'missing':
-            text += f"• Missing from Invoices\n"
-            text += f"• Expected Quantity: {result['offer_quantity']}\n"
-            
-        elif result['status'] == 'extra_item':
-            text += f"• Not in Original Offer\n"
-            text += f"• Delivered Quantity: {result['delivered_quantity']}\n"
-            
-        return text
+        return _DISCREPANCY_FORMATTERS.get(result['status'], _format_other_discrepancy)(result)
 
     def _format_path(self, path: str) -> str:
         """Format a file path for display"""
-        return path.split('/')[-1]
+        # Uses the platform's separators, paths come from the local folders
+        return os.path.basename(path)
 
     def _format_currency(self, amount: Decimal) -> str:
         """Format currency amount"""
@@ -273,46 +412,107 @@ class SlackNotifier:
             bool: True if notification was sent successfully
         """
         try:
-            blocks = [
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "❌ Error Alert"
-                    }
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"*Error:* {error_message}"
-                    }
-                }
-            ]
-            
-            if details:
-                blocks.append({
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"*Details:*\n```{details}```"
-                    }
-                })
+            if self._send_queue is not None:
+                self._send_queue.put(partial(self._create_error_blocks, error_message, details))
+                return True
             
-            response = self.session.post(
-                self.config.webhook_url,
-                json={
-                    "channel": self.config.channel,
-                    "blocks": blocks
-                }
-            )
+            blocks = self._create_error_blocks(error_message, details)
+            response = self._post(blocks)
             
             if response.status_code != 200:
-                logging.error(f"Error sending error notification to Slack: {response.text}")
+                logger.error("Error sending error notification to Slack: %s", response.text)
                 return False
                 
             return True
             
         except Exception as e:
-            logging.error(f"Error sending error notification to Slack: {str(e)}")
+            logger.error("Error sending error notification to Slack: %s", e)
             return False
+
+    def _create_error_blocks(self, error_message: str, details: Optional[str]) -> List[Dict]:
+        """Create formatted message blocks for an error notification"""
+        blocks = [
+            _ERROR_HEADER_BLOCK,
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Error:* {error_message}"
+                }
+            }
+        ]
+        
+        if details:
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Details:*\n```{details}```"
+                }
+            })
+        
+        return blocks
+
+    def _post(self, blocks: List[Dict]) -> requests.Response:
+        """Post message blocks to the configured webhook"""
+        payload = {
+            "channel": self.config.channel,
+            "blocks": blocks
+        }
+        return self.session.post(self.config.webhook_url, data=_encode_json(payload))
+
+    def close(self):
+        """Deliver any queued messages and stop the background sender"""
+        if self._send_thread is not None:
+            self._send_queue.put(_STOP)
+            self._send_thread.join()
+            self._send_thread = None
+
+    def _send_worker(self):
+        """Post queued messages, merging those that arrive close together"""
+        while True:
+            batch = [self._send_queue.get()]
+            
+            # Gather whatever else arrives within the coalescing window
+            deadline = time.monotonic() + COALESCE_WINDOW
+            while len(batch) < MAX_COALESCED_MESSAGES and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._send_queue.get(timeout=remaining))
+                except Empty:
+                    break
+            
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            
+            messages = []
+            for build_blocks in batch:
+                try:
+                    messages.append(build_blocks())
+                except Exception as e:
+                    logger.error("Error creating Slack notification: %s", e)
+            
+            for blocks in self._merge_messages(messages):
+                try:
+                    response = self._post(blocks)
+                    if response.status_code != 200:
+                        logger.error("Error sending Slack notification: %s", response.text)
+                except Exception as e:
+                    logger.error("Error sending Slack notification: %s", e)
+            
+            if stopping:
+                return
+
+    def _merge_messages(self, messages: List[List[Dict]]) -> List[List[Dict]]:
+        """Combine message block lists without exceeding Slack's block limit"""
+        merged: List[List[Dict]] = []
+        for blocks in messages:
+            if merged and len(merged[-1]) + 1 + len(blocks) <= MAX_BLOCKS_PER_MESSAGE:
+                merged[-1].append(_DIVIDER_BLOCK)
+                merged[-1].extend(blocks)
+            else:
+                merged.append(list(blocks))
+        return merged
@@ -1,12 +1,124 @@
 import pdfplumber
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
-from decimal import Decimal
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from itertools import islice, repeat
+from operator import attrgetter, itemgetter
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from decimal import Decimal, InvalidOperation
 import re
 
+try:
+    # MuPDF parses in C, several times faster than pdfminer
+    import fitz
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+# Header keywords identifying each table column, checked in order
+_HEADER_PATTERNS = {
+    'item_code': re.compile(r'item|code|article'),
+    'description': re.compile(r'desc|product'),
+    'quantity': re.compile(r'qty|quantity|amount'),
+    'unit_price': re.compile(r'price|unit'),
+    'total_price': re.compile(r'total|sum'),
+}
+
+# Distinct cell texts whose parsed number is remembered; quantities and
+# prices repeat a lot within and across documents, and Decimals are
+# immutable so the results can be shared
+NUMBER_CACHE_SIZE = 4096
+
+# Distinct table headers whose columns are remembered
+HEADER_CACHE_SIZE = 256
+
+# Item fields read from table rows, with the column assumed when the
+# header does not name it
+_ROW_COLUMNS = (
+    ('item_code', 0),
+    ('description', 1),
+    ('quantity', 2),
+    ('unit_price', 3),
+    ('total_price', 4),
+)
+
+# Extraction results kept in memory, keyed by path, mtime and size
+EXTRACTION_CACHE_SIZE = 64
+
+# Bump when extraction changes so results cached on disk are not reused
+EXTRACTION_CACHE_VERSION = 2
+
+# Bytes read at a time when hashing a PDF for the disk cache
+HASH_CHUNK_SIZE = 1 << 20
+
+# Documents with fewer pages are extracted in-process; below this, starting
+# worker processes costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 32
+
+# Minimum pages handed to each worker process
+PAGES_PER_WORKER = 16
+
+# Shared zero for absent quantities and prices; Decimals are immutable
+_ZERO = Decimal('0')
+
+class _NumericCharacters(dict):
+    """
+    str.translate table keeping digits, separators and the sign
+    
+    Every other character, e.g. currency symbols, is deleted. Characters are
+    classified the first time they are seen, so later lookups stay in C.
+    """
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        # Any Unicode decimal digit, like the \d the table replaces
+        kept = codepoint if chr(codepoint).isdecimal() else None
+        self[codepoint] = kept
+        return kept
+
+_NUMERIC_CHARACTERS = _NumericCharacters({ord(c): ord(c) for c in '.,-'})
+
+# Separator rewrites for numbers written with thousands separators
+_DROP_COMMAS = str.maketrans('', '', ',')  # 1,234.56
+_DECIMAL_COMMA = str.maketrans({'.': None, ',': '.'})  # 1.234,56 and 1234,56
+
+# Common formats for item information in text, combined into one
+# alternation so the text is scanned once. Each alternative is wrapped in
+# an outer group, whose name is the match's lastgroup
+_TEXT_ITEM_RE = re.compile(
+    # Labelled blocks: "Item:", an optional "Description:", then "Quantity:"
+    # and "Price:" lines, the price possibly prefixed with a currency sign
+    r'(?P<block>Item:[ \t]*(?P<block_code>\S+)\s+'
+    r'(?:Description:[ \t]*(?P<block_description>[^\n]*)\s+)?'
+    r'Quantity:[ \t]*(?P<block_quantity>\d[\d.,]*)[^\n]*\s+'
+    r'Price:[ \t]*[€$]?[ \t]*(?P<block_unit_price>\d[\d.,]*))'
+    r'|'
+    # Item code followed by quantity and price on one line. The description
+    # is lazy and stops where whitespace and a digit follow, so it never has
+    # to backtrack over its own trailing whitespace
+    r'(?P<line>(?P<line_code>[A-Z0-9-]+)\s+'
+    r'(?P<line_description>[^0-9\n]+?)(?=\s+\d)\s+'
+    r'(?P<line_quantity>\d+(?:\.\d+)?)\s+'
+    r'(?P<line_unit_price>\d+(?:\.\d+)?))'
+    
+    # Add more alternatives as needed for different document formats
+)
+
+
 @dataclass
 class Item:
     """Represents an item from either an offer or invoice"""
+    # No per-instance __dict__ for the many items of large documents
+    __slots__ = ('item_code', 'description', 'quantity', 'unit_price', 'total_price')
+    
     item_code: str
     description: str
     quantity: Decimal
@@ -20,6 +132,12 @@ class Item:
 @dataclass
 class ComparisonResult:
     """Represents the result of comparing an item between offer and invoices"""
+    __slots__ = (
+        'item_code', 'description', 'offer_quantity', 'delivered_quantity',
+        'offer_price', 'invoiced_price', 'quantity_difference',
+        'price_difference', 'status'
+    )
+    
     item_code: str
     description: str
     offer_quantity: Decimal
@@ -30,32 +148,299 @@ class ComparisonResult:
     price_difference: Decimal
     status: str  # 'match', 'quantity_mismatch', 'price_mismatch', 'missing'
 
+_get_status = attrgetter('status')
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def _parse_number(value: str) -> Decimal:
+    """Parse a non-empty table cell into a Decimal, see PDFProcessor._parse_decimal"""
+    # Remove currency symbols and other non-numeric characters
+    clean_value = value.translate(_NUMERIC_CHARACTERS)
+    
+    # Handle different decimal separators; with both present the one
+    # that comes last separates the decimals
+    if ',' in clean_value:
+        if clean_value.rfind('.') > clean_value.rfind(','):
+            clean_value = clean_value.translate(_DROP_COMMAS)
+        else:
+            clean_value = clean_value.translate(_DECIMAL_COMMA)
+        
+    try:
+        return Decimal(clean_value)
+    except InvalidOperation:
+        return _ZERO
+
+@lru_cache(maxsize=HEADER_CACHE_SIZE)
+def _identify_header_columns(header_key: Tuple[str, ...]) -> Mapping[str, int]:
+    """Map fields to their column in a lowercased table header"""
+    columns = {}
+    
+    for i, header_lower in enumerate(header_key):
+        # The first matching field wins, in _HEADER_PATTERNS order
+        for field, pattern in _HEADER_PATTERNS.items():
+            if pattern.search(header_lower):
+                columns[field] = i
+                break
+    
+    # Shared by every table with this header, so handed out read-only
+    return MappingProxyType(columns)
+
+def _header_key(header_row: List[str]) -> Tuple[str, ...]:
+    """Normalize a table header into the key of the header caches"""
+    # Case and surrounding whitespace never change the matched columns
+    return tuple(str(header).strip().lower() for header in header_row)
+
+@lru_cache(maxsize=HEADER_CACHE_SIZE)
+def _header_cell_getter(header_key: Tuple[str, ...]) -> Optional[Callable[[List[str]], Tuple[str, ...]]]:
+    """
+    Getter fetching a row's item fields in a single C call
+    
+    Returns None for headers without any recognised column.
+    """
+    columns = _identify_header_columns(header_key)
+    if not columns:
+        return None
+    return itemgetter(*(columns.get(field, default) for field, default in _ROW_COLUMNS))
+
+def _extract_document(processor_type: type, cache_dir: Optional[Path], pdf_path: str) -> List[Item]:
+    """Extract items from a whole PDF, run in a worker process"""
+    return processor_type(cache_dir).extract_items_from_pdf(pdf_path)
+
+def _extract_page_range(pdf_path: str, page_numbers: List[int]) -> List[Item]:
+    """Extract items from some pages of a PDF, run in a worker process"""
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
+        return list(PDFProcessor()._iter_pages(pdf.pages))
+
+def _file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's content"""
+    with open(path, 'rb') as f:
+        # hashlib.file_digest (Python 3.11+) hashes without Python-level reads
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+@lru_cache(maxsize=EXTRACTION_CACHE_SIZE)
+def _extract_cached(processor_type: type,
+                    pdf_path: str,
+                    mtime_ns: int,
+                    size: int,
+                    cache_dir: Optional[Path]) -> Tuple[Item, ...]:
+    """
+    Extract items from one version of a PDF, reusing earlier results
+    
+    Args:
+        processor_type: PDFProcessor class whose extraction is used
+        pdf_path: Path to the PDF document
+        mtime_ns: Modification time of the PDF, part of the cache key
+        size: Size of the PDF in bytes, part of the cache key
+        cache_dir: Directory keeping results across runs, or None; its
+            files are keyed by the PDF's content, so copies of a document
+            share one entry
+        
+    Returns:
+        Items of the document
+    """
+    version = EXTRACTION_CACHE_VERSION
+    cache_file = None
+    
+    if cache_dir is not None:
+        try:
+            cache_file = cache_dir / f'{_file_digest(pdf_path)}.pkl'
+            with open(cache_file, 'rb') as f:
+                cached_version, items = pickle.load(f)
+            if cached_version == version:
+                return items
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Ignoring unreadable extraction cache %s: %s", cache_file, e)
+    
+    items = tuple(processor_type()._extract_uncached(pdf_path))
+    
+    if cache_file is not None and items:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see half a file
+            tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((version, items), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning("Could not write extraction cache %s: %s", cache_file, e)
+    
+    return items
+
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the PDF processor
+        
+        Args:
+            cache_dir: Directory for keeping extracted items across runs,
+                e.g. ~/.cache/pdf_comparison; results are always cached
+                in memory while the PDF is unchanged
+        """
         self.price_tolerance = Decimal('0.02')  # 2% tolerance for price differences
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
     
     def extract_items_from_pdf(self, pdf_path: str) -> List[Item]:
         """Extract items from a PDF document"""
-        items = []
+        try:
+            # A changed file gets a new mtime or size and is extracted again;
+            # failures raise and are not cached, so a later call retries
+            stat = os.stat(pdf_path)
+            items = _extract_cached(type(self), pdf_path, stat.st_mtime_ns, stat.st_size, self.cache_dir)
+        except Exception as e:
+            logger.error("Error processing PDF %s: %s", pdf_path, e)
+            return []
+        
+        # The cached items are shared, so callers get their own copies
+        return [replace(item) for item in items]
+    
+    def extract_batch(self, pdf_paths: List[str], max_workers: Optional[int] = None) -> List[List[Item]]:
+        """
+        Extract items from several PDF documents in separate processes
+        
+        Args:
+            pdf_paths: Paths of the PDF documents
+            max_workers: Maximum number of worker processes, defaults to
+                the CPU count
+            
+        Returns:
+            Items of each document, in the order of pdf_paths
+        """
+        workers = min(max_workers or os.cpu_count() or 1, len(pdf_paths))
+        if workers < 2:
+            return [self.extract_items_from_pdf(pdf_path) for pdf_path in pdf_paths]
+        
+        try:
+            # Spawned rather than forked workers, callers run on threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                return list(pool.map(
+                    _extract_document, repeat(type(self)), repeat(self.cache_dir), pdf_paths
+                ))
+        except (OSError, RuntimeError) as e:
+            # Workers could not be started, e.g. no __main__ guard
+            logger.warning("Falling back to serial extraction of %s PDFs: %s", len(pdf_paths), e)
+            return [self.extract_items_from_pdf(pdf_path) for pdf_path in pdf_paths]
+    
+    def _extract_uncached(self, pdf_path: str) -> List[Item]:
+        """
+        Extract items from a PDF document without consulting the caches
+        
+        Errors opening or parsing the PDF are raised, not turned into an
+        empty result, so the caches never remember a failed extraction.
+        """
+        if fitz is not None:
+            try:
+                items = list(self._iter_with_pymupdf(pdf_path))
+                if items:
+                    return items
+                # Nothing recognised, pdfplumber's table detection may do better
+            except Exception as e:
+                logger.warning("Error processing PDF %s with PyMuPDF: %s", pdf_path, e)
+        
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+            workers = min(os.cpu_count() or 1, page_count // PAGES_PER_WORKER)
+            if page_count < PARALLEL_PAGE_THRESHOLD or workers < 2:
+                return list(self._iter_pages(pdf.pages))
+        
+        return self._extract_pages_parallel(pdf_path, page_count, workers)
+    
+    def iter_items_from_pdf(self, pdf_path: str) -> Iterator[Item]:
+        """
+        Yield the items of a PDF document page by page
+        
+        Unlike extract_items_from_pdf, the document's items are never held
+        all at once, which keeps memory flat for very large PDFs. Results
+        are neither cached nor extracted in parallel.
+        
+        Args:
+            pdf_path: Path to the PDF document
+            
+        Yields:
+            Items in page order
+        """
+        if fitz is not None:
+            found = False
+            try:
+                for item in self._iter_with_pymupdf(pdf_path):
+                    found = True
+                    yield item
+            except Exception as e:
+                logger.warning("Error processing PDF %s with PyMuPDF: %s", pdf_path, e)
+            
+            if found:
+                return
+            # Nothing recognised, pdfplumber's table detection may do better
         
         try:
             with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    # Extract tables from the page
-                    tables = page.extract_tables()
-                    
-                    for table in tables:
-                        items.extend(self._process_table(table))
-                        
-                    # Also look for text that might contain item information
-                    text = page.extract_text()
-                    items.extend(self._process_text(text))
-                    
+                yield from self._iter_pages(pdf.pages)
         except Exception as e:
-            print(f"Error processing PDF {pdf_path}: {str(e)}")
-            return []
+            logger.error("Error processing PDF %s: %s", pdf_path, e)
+    
+    def _iter_with_pymupdf(self, pdf_path: str) -> Iterator[Item]:
+        """Yield items from the tables and text of a PDF using PyMuPDF"""
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                # Table detection needs PyMuPDF 1.23 or later
+                if hasattr(page, 'find_tables'):
+                    for table in page.find_tables().tables:
+                        yield from self._process_table(table.extract())
+                
+                yield from self._process_text(page.get_text("text"))
+    
+    def _extract_pages_parallel(self, pdf_path: str, page_count: int, workers: int) -> List[Item]:
+        """
+        Extract items from contiguous page ranges in separate processes
+        
+        Args:
+            pdf_path: Path to the PDF document
+            page_count: Number of pages in the document
+            workers: Number of worker processes to use
             
-        return items
+        Returns:
+            Items of all pages, in page order
+        """
+        chunk_size = -(-page_count // workers)
+        page_ranges = [
+            list(range(start + 1, min(start + chunk_size, page_count) + 1))
+            for start in range(0, page_count, chunk_size)
+        ]
+        
+        try:
+            # Spawned rather than forked workers, callers run on threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(page_ranges), mp_context=context) as pool:
+                chunks = pool.map(_extract_page_range, repeat(pdf_path), page_ranges)
+                return [item for chunk in chunks for item in chunk]
+        except (OSError, RuntimeError) as e:
+            # Workers could not be started, e.g. no __main__ guard
+            logger.warning("Falling back to serial extraction of %s: %s", pdf_path, e)
+            with pdfplumber.open(pdf_path) as pdf:
+                return list(self._iter_pages(pdf.pages))
+    
+    def _iter_pages(self, pages) -> Iterator[Item]:
+        """Yield items from the tables and text of the given pages"""
+        for page in pages:
+            # Extract tables from the page
+            tables = page.extract_tables()
+            
+            for table in tables:
+                yield from self._process_table(table)
+                
+            # Also look for text that might contain item information
+            text = page.extract_text()
+            yield from self._process_text(text)
+            
+            # Release the page's parsed characters before the next page
+            page.flush_cache()
     
     def _process_table(self, table: List[List[str]]) -> List[Item]:
         """Process a table extracted from PDF and convert to Items"""
@@ -64,68 +449,65 @@ class PDFProcessor:
         if not table:
             return items
             
-        # Try to identify column positions based on headers
-        header_row = table[0]
-        column_indices = self._identify_columns(header_row)
+        # Try to identify column positions based on headers; the getter
+        # fetching a row's cells is cached along with them
+        get_cells = _header_cell_getter(_header_key(table[0]))
         
-        if not column_indices:
+        if get_cells is None:
             return items
             
-        # Process each row
-        for row in table[1:]:
+        # Process each row, without copying the table
+        for row in islice(table, 1, None):
             try:
-                item = self._parse_row(row, column_indices)
+                item = self._parse_row(row, get_cells)
                 if item:
                     items.append(item)
             except Exception as e:
-                print(f"Error processing row {row}: {str(e)}")
+                logger.debug("Error processing row %s: %s", row, e)
                 continue
                 
         return items
     
     def _identify_columns(self, header_row: List[str]) -> Dict[str, int]:
         """Identify the position of important columns in the table"""
-        columns = {}
+        # Tables of one document, and documents of one vendor, repeat the
+        # same headers, so the lookup is cached by the normalized header
+        return dict(_identify_header_columns(_header_key(header_row)))
+    
+    def _parse_row(self,
+                   row: List[str],
+                   get_cells: Callable[[List[str]], Tuple[str, ...]]) -> Optional[Item]:
+        """
+        Parse a row from the table into an Item object
         
-        for i, header in enumerate(header_row):
-            header_lower = str(header).lower()
+        Args:
+            row: Table row
+            get_cells: Returns the row's cells for the fields in _ROW_COLUMNS
             
-            if any(x in header_lower for x in ['item', 'code', 'article']):
-                columns['item_code'] = i
-            elif any(x in header_lower for x in ['desc', 'description', 'product']):
-                columns['description'] = i
-            elif any(x in header_lower for x in ['qty', 'quantity', 'amount']):
-                columns['quantity'] = i
-            elif any(x in header_lower for x in ['price', 'unit']):
-                columns['unit_price'] = i
-            elif any(x in header_lower for x in ['total', 'sum']):
-                columns['total_price'] = i
-                
-        return columns
-    
-    def _parse_row(self, row: List[str], column_indices: Dict[str, int]) -> Optional[Item]:
-        """Parse a row from the table into an Item object"""
+        Returns:
+            The item, or None if the row does not describe one
+        """
         try:
-            # Extract values using column indices
-            item_code = str(row[column_indices.get('item_code', 0)]).strip()
-            description = str(row[column_indices.get('description', 1)]).strip()
+            code_cell, description_cell, quantity_cell, unit_price_cell, total_price_cell = get_cells(row)
             
-            # Parse quantity and prices, handling various formats
-            quantity = self._parse_decimal(row[column_indices.get('quantity', 2)])
-            unit_price = self._parse_decimal(row[column_indices.get('unit_price', 3)])
-            total_price = self._parse_decimal(row[column_indices.get('total_price', 4)])
+            # Parse quantity and prices, handling various formats; rows
+            # without them are dismissed before the other cells are touched
+            item_code = str(code_cell).strip()
+            quantity = self._parse_decimal(quantity_cell)
+            unit_price = self._parse_decimal(unit_price_cell)
             
             if item_code and quantity and unit_price:
+                total_price = self._parse_decimal(total_price_cell)
                 return Item(
                     item_code=item_code,
-                    description=description,
+                    description=str(description_cell).strip(),
                     quantity=quantity,
                     unit_price=unit_price,
                     total_price=total_price or (quantity * unit_price)
                 )
                 
         except Exception as e:
-            print(f"Error parsing row: {str(e)}")
+            logger.debug("Error parsing row %s: %s", row, e)
             return None
             
         return None
@@ -134,74 +516,64 @@ class PDFProcessor:
         """Extract items from text using regex patterns"""
         items = []
         
-        # Common patterns for item information in text
-        patterns = [
-            # Pattern 1: Item code followed by quantity and price
-            r'(?P<item_code>[A-Z0-9-]+)\s+'
-            r'(?P<description>[^0-9\n]+)\s+'
-            r'(?P<quantity>\d+(?:\.\d+)?)\s+'
-            r'(?P<unit_price>\d+(?:\.\d+)?)',
-            
-            # Add more patterns as needed for different document formats
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                try:
-                    item = Item(
-                        item_code=match.group('item_code'),
-                        description=match.group('description').strip(),
-                        quantity=Decimal(match.group('quantity')),
-                        unit_price=Decimal(match.group('unit_price')),
-                        total_price=Decimal(match.group('quantity')) * Decimal(match.group('unit_price'))
-                    )
-                    items.append(item)
-                except Exception as e:
-                    print(f"Error parsing text match: {str(e)}")
-                    continue
-                    
+        for match in _TEXT_ITEM_RE.finditer(text):
+            # Fields are prefixed with the name of the matched alternative
+            fmt = match.lastgroup
+            try:
+                quantity = self._parse_decimal(match.group(fmt + '_quantity'))
+                unit_price = self._parse_decimal(match.group(fmt + '_unit_price'))
+                item = Item(
+                    item_code=match.group(fmt + '_code'),
+                    description=(match.group(fmt + '_description') or '').strip(),
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    total_price=quantity * unit_price
+                )
+                items.append(item)
+            except Exception as e:
+                logger.debug("Error parsing text match %r: %s", match.group(0), e)
+                continue
+                
         return items
     
     def _parse_decimal(self, value: str) -> Decimal:
         """Parse a string into a Decimal, handling various number formats"""
-        if not value:
-            return Decimal('0')
-            
-        # Remove currency symbols and other non-numeric characters
-        clean_value = re.sub(r'[^\d.,\-]', '', str(value))
+        # Empty cells are the most common case, they skip _parse_number and its cache
+        if not value or (isinstance(value, str) and value.isspace()):
+            return _ZERO
         
-        # Handle different decimal separators
-        if ',' in clean_value and '.' in clean_value:
-            # Format: 1,234.56
-            clean_value = clean_value.replace(',', '')
-        elif ',' in clean_value:
-            # Format: 1234,56
-            clean_value = clean_value.replace(',', '.')
-            
-        try:
-            return Decimal(clean_value)
-        except:
-            return Decimal('0')
+        return _parse_number(str(value))
     
-    def compare_documents(self, offer_items: List[Item], invoice_items: List[Item]) -> List[ComparisonResult]:
-        """Compare items from offer with items from invoices"""
+    def compare_documents(self, offer_items: Iterable[Item], invoice_items: Iterable[Item]) -> List[ComparisonResult]:
+        """Compare items from offer with items from invoices, both may be streamed"""
         results = []
         
         # Group invoice items by item code
-        invoice_items_dict = {}
+        invoice_items_dict: Dict[str, Item] = {}
         for item in invoice_items:
-            if item.item_code in invoice_items_dict:
-                # Sum quantities for the same item
-                existing = invoice_items_dict[item.item_code]
-                existing.quantity += item.quantity
-                existing.total_price += item.total_price
-            else:
+            existing = invoice_items_dict.get(item.item_code)
+            if existing is None:
                 invoice_items_dict[item.item_code] = item
+            else:
+                # Sum quantities for the same item into a new Item, so the
+                # caller's invoice items are left untouched
+                invoice_items_dict[item.item_code] = replace(
+                    existing,
+                    quantity=existing.quantity + item.quantity,
+                    total_price=existing.total_price + item.total_price
+                )
         
-        # Compare each offer item with invoice items
+        # Compare each offer item with invoice items; matched invoice items
+        # move out of invoice_items_dict, leaving only the extra ones
+        price_tolerance = self.price_tolerance
+        matched_items: Dict[str, Item] = {}
         for offer_item in offer_items:
-            invoice_item = invoice_items_dict.get(offer_item.item_code)
+            invoice_item = invoice_items_dict.pop(offer_item.item_code, None)
+            if invoice_item is None:
+                # Offers may list the same item more than once
+                invoice_item = matched_items.get(offer_item.item_code)
+            else:
+                matched_items[offer_item.item_code] = invoice_item
             
             if not invoice_item:
                 # Item in offer but not in invoices
@@ -209,11 +581,11 @@ class PDFProcessor:
                     item_code=offer_item.item_code,
                     description=offer_item.description,
                     offer_quantity=offer_item.quantity,
-                    delivered_quantity=Decimal('0'),
+                    delivered_quantity=_ZERO,
                     offer_price=offer_item.unit_price,
-                    invoiced_price=Decimal('0'),
+                    invoiced_price=_ZERO,
                     quantity_difference=offer_item.quantity,
-                    price_difference=Decimal('0'),
+                    price_difference=_ZERO,
                     status='missing'
                 ))
                 continue
@@ -222,11 +594,13 @@ class PDFProcessor:
             quantity_diff = offer_item.quantity - invoice_item.quantity
             price_diff = offer_item.unit_price - invoice_item.unit_price
             
-            # Determine status
+            # Determine status; the tolerance is relative to the offer price,
+            # compared without dividing by it. Identical prices, the usual
+            # case for matching invoices, skip the tolerance arithmetic
             status = 'match'
-            if quantity_diff != 0:
+            if quantity_diff:
                 status = 'quantity_mismatch'
-            elif abs(price_diff / offer_item.unit_price) > self.price_tolerance:
+            elif price_diff and abs(price_diff) > price_tolerance * abs(offer_item.unit_price):
                 status = 'price_mismatch'
             
             results.append(ComparisonResult(
@@ -241,50 +615,40 @@ class PDFProcessor:
                 status=status
             ))
         
-        # Check for items in invoices but not in offer
-        offer_item_codes = {item.item_code for item in offer_items}
+        # Whatever is left was invoiced but not offered
         for invoice_item in invoice_items_dict.values():
-            if invoice_item.item_code not in offer_item_codes:
-                results.append(ComparisonResult(
-                    item_code=invoice_item.item_code,
-                    description=invoice_item.description,
-                    offer_quantity=Decimal('0'),
-                    delivered_quantity=invoice_item.quantity,
-                    offer_price=Decimal('0'),
-                    invoiced_price=invoice_item.unit_price,
-                    quantity_difference=-invoice_item.quantity,
-                    price_difference=-invoice_item.unit_price,
-                    status='extra_item'
-                ))
+            results.append(ComparisonResult(
+                item_code=invoice_item.item_code,
+                description=invoice_item.description,
+                offer_quantity=_ZERO,
+                delivered_quantity=invoice_item.quantity,
+                offer_price=_ZERO,
+                invoiced_price=invoice_item.unit_price,
+                quantity_difference=-invoice_item.quantity,
+                price_difference=-invoice_item.unit_price,
+                status='extra_item'
+            ))
         
         return results
 
     def generate_summary(self, results: List[ComparisonResult]) -> Dict:
         """Generate a summary of comparison results"""
-        summary = {
+        # Counter counts an iterable in C, unlike per-item increments
+        status_counts = Counter(map(_get_status, results))
+        total_quantity_difference = sum(
+            (abs(result.quantity_difference) for result in results), _ZERO
+        )
+        total_price_difference = sum(
+            (abs(result.price_difference) for result in results), _ZERO
+        )
+        
+        return {
             'total_items': len(results),
-            'matches': 0,
-            'quantity_mismatches': 0,
-            'price_mismatches': 0,
-            'missing_items': 0,
-            'extra_items': 0,
-            'total_quantity_difference': Decimal('0'),
-            'total_price_difference': Decimal('0')
+            'matches': status_counts['match'],
+            'quantity_mismatches': status_counts['quantity_mismatch'],
+            'price_mismatches': status_counts['price_mismatch'],
+            'missing_items': status_counts['missing'],
+            'extra_items': status_counts['extra_item'],
+            'total_quantity_difference': total_quantity_difference,
+            'total_price_difference': total_price_difference
         }
-        
-        for result in results:
-            if result.status == 'match':
-                summary['matches'] += 1
-            elif result.status == 'quantity_mismatch':
-                summary['quantity_mismatches'] += 1
-            elif result.status == 'price_mismatch':
-                summary['price_mismatches'] += 1
-            elif result.status == 'missing':
-                summary['missing_items'] += 1
-            elif result.status == 'extra_item':
-                summary['extra_items'] += 1
-                
-            summary['total_quantity_difference'] += abs(result.quantity_difference)
-            summary['total_price_difference'] += abs(result.price_difference)
-        
-        return summary
@@ -9,11 +9,18 @@ import os
 import tempfile
 from pathlib import Path
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import yaml
 import requests
 import fpdf
 
+# Prefer the libyaml-backed loader, falling back to pure Python
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -157,6 +164,7 @@ def test_slack_connectivity(webhook_url=None):
     try:
         response = requests.post(
             webhook_url,
+            timeout=30,
             json={
                 "text": "PDF Comparison Tool - Setup Test",
                 "blocks": [{
@@ -218,7 +226,7 @@ def check_config():
     
     try:
         with open(config_path) as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YamlLoader)
             
         required_sections = ['monitoring', 'processing', 'notifications', 'ui', 'database', 'logging']
         missing_sections = []
@@ -242,27 +250,39 @@ def main():
     logger.info("Starting setup verification...")
     logger.info("=" * 50)
     
-    results = {
-        "Python Version": check_python_version(),
-        "Dependencies": check_dependencies(),
-        "Required Folders": check_folders(),
-        "Configuration": check_config(),
-        "PDF Processing": test_pdf_processing(),
-        "File Monitoring": test_file_monitoring(),
-        "Database": test_database(),
-        "GUI": test_gui()
+    checks = {
+        "Python Version": check_python_version,
+        "Dependencies": check_dependencies,
+        "Required Folders": check_folders,
+        "Configuration": check_config,
+        "PDF Processing": test_pdf_processing,
+        "File Monitoring": test_file_monitoring,
+        "Database": test_database,
     }
     
     # Get Slack webhook URL from config if available
     try:
         with open('config/settings.yaml') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YamlLoader)
             webhook_url = config.get('notifications', {}).get('slack', {}).get('webhook_url')
             if webhook_url:
-                results["Slack Connectivity"] = test_slack_connectivity(webhook_url)
+                checks["Slack Connectivity"] = lambda: test_slack_connectivity(webhook_url)
     except:
         pass
     
+    # The checks are independent and mostly wait on disk or network, so
+    # they run concurrently; Qt must stay on the main thread meanwhile
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = {name: executor.submit(check) for name, check in checks.items()}
+        gui_result = test_gui()
+        results = {name: future.result() for name, future in futures.items()}
+    
+    # Reported in the usual order, with the optional Slack check last
+    slack_result = results.pop("Slack Connectivity", None)
+    results["GUI"] = gui_result
+    if "Slack Connectivity" in checks:
+        results["Slack Connectivity"] = slack_result
+    
     logger.info("\nTest Results:")
     logger.info("=" * 50)
     
@@ -0,0 +1,66 @@
+import json
+import pytest
+from types import SimpleNamespace
+
+class Recorder:
+    """Minimal call-recording callable for callbacks that only need their calls checked"""
+    
+    def __init__(self, side_effect=None):
+        # Raised on every call when set
+        self.side_effect = side_effect
+        self.calls = []
+    
+    def __call__(self, *args, **kwargs):
+        # list.append is atomic, so handler threads can record concurrently
+        self.calls.append((args, kwargs))
+        if self.side_effect is not None:
+            raise self.side_effect
+    
+    @property
+    def call_count(self):
+        return len(self.calls)
+    
+    def assert_not_called(self):
+        assert not self.calls, f"Expected no calls, got {self.calls}"
+    
+    def assert_called_with(self, *args, **kwargs):
+        assert self.calls, "Expected a call, got none"
+        assert self.calls[-1] == (args, kwargs), f"Last call was {self.calls[-1]}"
+    
+    def assert_called_once_with(self, *args, **kwargs):
+        assert len(self.calls) == 1, f"Expected one call, got {self.calls}"
+        self.assert_called_with(*args, **kwargs)
+    
+    def assert_any_call(self, *args, **kwargs):
+        assert (args, kwargs) in self.calls, f"{(args, kwargs)} not in {self.calls}"
+
+@pytest.fixture
+def make_recorder():
+    """Factory for Recorder callbacks, e.g. ones raising a side_effect"""
+    return Recorder
+
+@pytest.fixture
+def recorder(make_recorder):
+    """Create a Recorder callback"""
+    return make_recorder()
+
+class SlackTransport:
+    """Stand-in for the notifier's HTTP session that records posted payloads"""
+    
+    def __init__(self):
+        # Status and body returned for every post
+        self.status_code = 200
+        self.text = 'ok'
+        # (url, decoded JSON payload) per post
+        self.posted = []
+    
+    def post(self, url, data=None, **kwargs):
+        self.posted.append((url, json.loads(data)))
+        return SimpleNamespace(status_code=self.status_code, text=self.text)
+
+@pytest.fixture
+def slack_transport(monkeypatch):
+    """Route every SlackNotifier created in the test through a SlackTransport"""
+    transport = SlackTransport()
+    monkeypatch.setattr('src.notifier._SLACK_SESSION', transport)
+    return transport
@@ -12,6 +12,12 @@ from src.config_manager import (
     LoggingConfig
 )
 
+# Prefer the libyaml-backed dumper, falling back to pure Python
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
 @pytest.fixture
 def temp_config_file():
     """Create a temporary config file for testing"""
@@ -68,7 +74,7 @@ def temp_config_file():
     }
     
     with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as tmp:
-        yaml.dump(config, tmp)
+        yaml.dump(config, tmp, Dumper=YamlDumper)
         return tmp.name
 
 @pytest.fixture
@@ -188,6 +194,34 @@ def test_update_processing_config(config_manager):
     assert config.extraction_method == 'text_only'
     assert config.track_partial_deliveries is False
 
+def test_config_getters_are_memoized(config_manager):
+    """Test that section configs are reused until the configuration changes"""
+    config = config_manager.get_processing_config()
+    assert config_manager.get_processing_config() is config
+    
+    config_manager.update_processing_config(price_tolerance=0.05)
+    assert config_manager.get_processing_config().price_tolerance == 0.05
+
+def test_batch_saves_once(config_manager, monkeypatch):
+    """Test that updates inside batch() are written in a single save"""
+    saves = []
+    save_config = config_manager.save_config
+    monkeypatch.setattr(config_manager, 'save_config', lambda: saves.append(1) or save_config())
+    
+    with config_manager.batch():
+        assert config_manager.update_monitoring_config(check_interval=15)
+        assert config_manager.update_processing_config(price_tolerance=0.1)
+        
+        # In-memory changes are visible before the batch is saved
+        assert config_manager.get_monitoring_config().check_interval == 15
+        assert not saves
+    
+    assert len(saves) == 1
+    
+    reloaded = ConfigManager(config_manager.config_path)
+    assert reloaded.get_monitoring_config().check_interval == 15
+    assert reloaded.get_processing_config().price_tolerance == 0.1
+
 def test_reset_to_defaults(config_manager):
     """Test resetting configuration to defaults"""
     # First modify some settings
@@ -225,6 +259,33 @@ def test_save_and_load_config(temp_config_file):
     processing_config = new_config_manager.get_processing_config()
     assert processing_config.price_tolerance == 0.05
 
+def test_cached_config_is_isolated(temp_config_file):
+    """Test that instances sharing the parse cache do not share state"""
+    first = ConfigManager(temp_config_file)
+    first.config['monitoring']['enabled'] = False
+    
+    # Unchanged file is served from the cache, without the unsaved change
+    second = ConfigManager(temp_config_file)
+    assert second.get_monitoring_config().enabled is True
+
+def test_saved_config_hash_probe(temp_config_file, monkeypatch):
+    """Test that a rewritten but unchanged file is not parsed again"""
+    config_manager = ConfigManager(temp_config_file)
+    config_manager.update_monitoring_config(check_interval=30)
+    
+    config_path = Path(temp_config_file)
+    assert config_path.read_text().startswith('# sha256: ')
+    
+    # Same content with a new mtime is recognised by its hash
+    config_path.write_bytes(config_path.read_bytes())
+    monkeypatch.setattr(yaml, 'load', lambda *args, **kwargs: pytest.fail("reparsed"))
+    assert ConfigManager(temp_config_file).get_monitoring_config().check_interval == 30
+    monkeypatch.undo()
+    
+    # Hand edits keep the stale header but must still be picked up
+    config_path.write_text(config_path.read_text().replace('check_interval: 30', 'check_interval: 45'))
+    assert ConfigManager(temp_config_file).get_monitoring_config().check_interval == 45
+
 def test_invalid_config_file():
     """Test handling of invalid configuration file"""
     with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as tmp:
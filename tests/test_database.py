@@ -3,6 +3,7 @@ import tempfile
 from pathlib import Path
 from datetime import datetime, timedelta
 from decimal import Decimal
+from sqlalchemy import delete, insert, text
 from src.database import DatabaseManager, ComparisonRecord
 
 @pytest.fixture
@@ -14,10 +15,17 @@ def temp_db():
         # Clean up
         Path(db_path).unlink()
 
-@pytest.fixture
-def db_manager(temp_db):
-    """Create a DatabaseManager instance with temporary database"""
-    return DatabaseManager(temp_db)
+@pytest.fixture(scope="session")
+def db_manager():
+    """Create a DatabaseManager instance with an in-memory database"""
+    return DatabaseManager(':memory:')
+
+@pytest.fixture(autouse=True)
+def clean_db(db_manager):
+    """Empty the shared database after each test"""
+    yield
+    with db_manager.bulk_session() as session:
+        session.execute(delete(ComparisonRecord))
 
 @pytest.fixture
 def sample_comparison_data():
@@ -78,6 +86,24 @@ def test_database_initialization(temp_db):
     db_manager = DatabaseManager(temp_db)
     assert Path(temp_db).exists()
 
+def test_engine_shared_per_file(temp_db):
+    """Test that managers of the same database file share one engine"""
+    first = DatabaseManager(temp_db)
+    second = DatabaseManager(temp_db)
+    
+    assert first.engine is second.engine
+    assert DatabaseManager(':memory:').engine is not DatabaseManager(':memory:').engine
+
+def test_recreated_file_gets_schema(temp_db):
+    """Test that a database file replaced under the same path is set up again"""
+    DatabaseManager(temp_db)
+    
+    # The new file may reuse the deleted file's inode
+    Path(temp_db).unlink()
+    Path(temp_db).touch()
+    
+    assert DatabaseManager(temp_db).get_statistics()['total_comparisons'] == 0
+
 def test_store_comparison(db_manager, sample_comparison_data):
     """Test storing comparison results"""
     record_id = db_manager.store_comparison(
@@ -101,6 +127,29 @@ def test_store_comparison(db_manager, sample_comparison_data):
     
     session.close()
 
+def test_store_comparisons_bulk(db_manager, sample_comparison_data):
+    """Test storing several comparison results at once"""
+    records = [
+        dict(sample_comparison_data, offer_path=f'/test/offers/offer{i}.pdf')
+        for i in range(150)
+    ]
+    
+    record_ids = db_manager.store_comparisons_bulk(records)
+    
+    assert len(record_ids) == len(records)
+    
+    # Verify IDs map back to the matching input records
+    session = db_manager.Session()
+    for i in (0, 75, 149):
+        record = session.query(ComparisonRecord).get(record_ids[i])
+        assert record.offer_path == f'/test/offers/offer{i}.pdf'
+        assert record.invoice_paths == sample_comparison_data['invoice_paths']
+        assert record.total_items == sample_comparison_data['summary']['total_items']
+    
+    session.close()
+    
+    assert db_manager.store_comparisons_bulk([]) == []
+
 def test_update_notification_status(db_manager, sample_comparison_data):
     """Test updating notification status"""
     # Store a record
@@ -133,14 +182,16 @@ def test_update_notification_status(db_manager, sample_comparison_data):
 def test_get_comparison_history(db_manager, sample_comparison_data):
     """Test retrieving comparison history"""
     # Store multiple records
-    for _ in range(3):
-        db_manager.store_comparison(
-            offer_path=sample_comparison_data['offer_path'],
-            invoice_paths=sample_comparison_data['invoice_paths'],
-            status=sample_comparison_data['status'],
-            summary=sample_comparison_data['summary'],
-            results=sample_comparison_data['results']
-        )
+    db_manager.store_comparisons_bulk([
+        {
+            'offer_path': sample_comparison_data['offer_path'],
+            'invoice_paths': sample_comparison_data['invoice_paths'],
+            'status': sample_comparison_data['status'],
+            'summary': sample_comparison_data['summary'],
+            'results': sample_comparison_data['results']
+        }
+        for _ in range(3)
+    ])
     
     # Get history
     history = db_manager.get_comparison_history(days=1)
@@ -151,54 +202,41 @@ def test_get_comparison_history(db_manager, sample_comparison_data):
     record = history[0]
     assert 'id' in record
     assert 'timestamp' in record
+    assert 'timestamp_ms' in record
     assert 'offer_path' in record
     assert 'invoice_paths' in record
     assert 'summary' in record
     assert 'results' in record
+    
+    # Decimal amounts are stored as JSON numbers
+    assert record['results'][2]['invoiced_price'] == 62.75
+    assert record['invoice_paths'] == sample_comparison_data['invoice_paths']
 
 def test_cleanup_old_records(db_manager, sample_comparison_data):
     """Test cleaning up old records"""
     # Store records with different timestamps
-    session = db_manager.Session()
-    
-    # Old record
-    old_record = ComparisonRecord(
-        timestamp=datetime.utcnow() - timedelta(days=10),
+    summary = sample_comparison_data['summary']
+    row = dict(
         offer_path=sample_comparison_data['offer_path'],
-        invoice_paths=str(sample_comparison_data['invoice_paths']),
-        status=sample_comparison_data['status'],
-        total_items=sample_comparison_data['summary']['total_items'],
-        matches=sample_comparison_data['summary']['matches'],
-        quantity_mismatches=sample_comparison_data['summary']['quantity_mismatches'],
-        price_mismatches=sample_comparison_data['summary']['price_mismatches'],
-        missing_items=sample_comparison_data['summary']['missing_items'],
-        extra_items=sample_comparison_data['summary']['extra_items'],
-        total_quantity_difference=float(sample_comparison_data['summary']['total_quantity_difference']),
-        total_price_difference=float(sample_comparison_data['summary']['total_price_difference']),
-        results=str(sample_comparison_data['results'])
-    )
-    
-    # Recent record
-    recent_record = ComparisonRecord(
-        timestamp=datetime.utcnow(),
-        offer_path=sample_comparison_data['offer_path'],
-        invoice_paths=str(sample_comparison_data['invoice_paths']),
+        invoice_paths=sample_comparison_data['invoice_paths'],
         status=sample_comparison_data['status'],
-        total_items=sample_comparison_data['summary']['total_items'],
-        matches=sample_comparison_data['summary']['matches'],
-        quantity_mismatches=sample_comparison_data['summary']['quantity_mismatches'],
-        price_mismatches=sample_comparison_data['summary']['price_mismatches'],
-        missing_items=sample_comparison_data['summary']['missing_items'],
-        extra_items=sample_comparison_data['summary']['extra_items'],
-        total_quantity_difference=float(sample_comparison_data['summary']['total_quantity_difference']),
-        total_price_difference=float(sample_comparison_data['summary']['total_price_difference']),
-        results=str(sample_comparison_data['results'])
+        total_items=summary['total_items'],
+        matches=summary['matches'],
+        quantity_mismatches=summary['quantity_mismatches'],
+        price_mismatches=summary['price_mismatches'],
+        missing_items=summary['missing_items'],
+        extra_items=summary['extra_items'],
+        total_quantity_difference=float(summary['total_quantity_difference']),
+        total_price_difference=float(summary['total_price_difference']),
+        results=sample_comparison_data['results']
     )
     
-    session.add(old_record)
-    session.add(recent_record)
-    session.commit()
-    session.close()
+    # Old and recent record, inserted in one executemany
+    with db_manager.bulk_session() as session:
+        session.execute(insert(ComparisonRecord), [
+            dict(row, timestamp=datetime.utcnow() - timedelta(days=10)),
+            dict(row, timestamp=datetime.utcnow())
+        ])
     
     # Clean up records older than 7 days
     deleted = db_manager.cleanup_old_records(days=7)
@@ -208,28 +246,55 @@ def test_cleanup_old_records(db_manager, sample_comparison_data):
     # Verify only recent record remains
     history = db_manager.get_comparison_history()
     assert len(history) == 1
-    assert (datetime.fromisoformat(history[0]['timestamp']) - datetime.utcnow()).days == 0
+    assert history[0]['invoice_paths'] == sample_comparison_data['invoice_paths']
+    assert history[0]['results'][0]['item_code'] == 'A123'
+    now_ms = (datetime.utcnow() - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
+    assert abs(now_ms - history[0]['timestamp_ms']) < 86_400_000
+
+def test_statistics_price_total_in_cents(db_manager, sample_comparison_data):
+    """Test that price differences are summed without float drift"""
+    db_manager.store_comparisons_bulk([
+        {
+            'offer_path': sample_comparison_data['offer_path'],
+            'invoice_paths': [],
+            'status': 'success',
+            'summary': {'total_price_difference': Decimal('0.10')},
+            'results': []
+        }
+        for _ in range(10)
+    ])
+    
+    assert db_manager.get_statistics()['total_price_difference'] == 1.0
+
+def test_timestamp_queries_use_index(db_manager):
+    """Test that the cleanup range filter is answered from the timestamp index"""
+    with db_manager.engine.connect() as connection:
+        plan = connection.execute(text(
+            "EXPLAIN QUERY PLAN DELETE FROM comparisons WHERE timestamp < 0"
+        )).fetchall()
+    
+    assert any('ix_comparisons_timestamp' in row[-1] for row in plan)
 
 def test_get_statistics(db_manager, sample_comparison_data):
     """Test getting comparison statistics"""
-    # Store some records with different statuses
-    db_manager.store_comparison(
-        offer_path=sample_comparison_data['offer_path'],
-        invoice_paths=sample_comparison_data['invoice_paths'],
-        status='success',
-        summary=sample_comparison_data['summary'],
-        results=sample_comparison_data['results']
-    )
-    
-    # Store a failed comparison
-    db_manager.store_comparison(
-        offer_path=sample_comparison_data['offer_path'],
-        invoice_paths=sample_comparison_data['invoice_paths'],
-        status='error',
-        summary={'total_items': 0, 'matches': 0},
-        results=[],
-        error_message='Test error'
-    )
+    # Store a successful and a failed comparison in one transaction
+    db_manager.store_comparisons_bulk([
+        {
+            'offer_path': sample_comparison_data['offer_path'],
+            'invoice_paths': sample_comparison_data['invoice_paths'],
+            'status': 'success',
+            'summary': sample_comparison_data['summary'],
+            'results': sample_comparison_data['results']
+        },
+        {
+            'offer_path': sample_comparison_data['offer_path'],
+            'invoice_paths': sample_comparison_data['invoice_paths'],
+            'status': 'error',
+            'summary': {'total_items': 0, 'matches': 0},
+            'results': [],
+            'error_message': 'Test error'
+        }
+    ])
     
     # Get statistics
     stats = db_manager.get_statistics(days=1)
@@ -241,6 +306,18 @@ def test_get_statistics(db_manager, sample_comparison_data):
     assert stats['total_matches'] == sample_comparison_data['summary']['matches']
     assert stats['total_quantity_mismatches'] == sample_comparison_data['summary']['quantity_mismatches']
     assert stats['total_price_mismatches'] == sample_comparison_data['summary']['price_mismatches']
+    assert stats['total_price_difference'] == 25.5
+
+def test_bulk_session_rolls_back(db_manager, sample_comparison_data):
+    """Test that a failing bulk session stores none of its rows"""
+    with pytest.raises(RuntimeError):
+        with db_manager.bulk_session() as session:
+            session.execute(insert(ComparisonRecord), [
+                {'offer_path': sample_comparison_data['offer_path'], 'status': 'success'}
+            ])
+            raise RuntimeError("abort")
+    
+    assert db_manager.get_comparison_history() == []
 
 def test_error_handling(db_manager, sample_comparison_data):
     """Test error handling in database operations"""
@@ -1,8 +1,11 @@
+import os
 import pytest
 import tempfile
+import threading
 import time
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import patch
+from src import file_monitor
 from src.file_monitor import PDFEventHandler, FolderMonitor, AutoProcessor
 
 @pytest.fixture
@@ -12,9 +15,9 @@ def temp_dir():
         yield tmp_dir
 
 @pytest.fixture
-def mock_callback():
+def mock_callback(recorder):
     """Create a mock callback function"""
-    return Mock()
+    return recorder
 
 @pytest.fixture
 def event_handler(mock_callback):
@@ -31,18 +34,25 @@ def auto_processor(folder_monitor, mock_callback):
     """Create an AutoProcessor instance"""
     return AutoProcessor(folder_monitor, mock_callback)
 
+# Content of every dummy PDF, shared instead of rebuilt per file
+PDF_BYTES = b'%PDF-1.4\n%Test PDF content'
+
 def create_pdf_file(directory: str, filename: str) -> Path:
     """Create a dummy PDF file"""
     file_path = Path(directory) / filename
-    file_path.write_bytes(b'%PDF-1.4\n%Test PDF content')
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, PDF_BYTES)
+    finally:
+        os.close(fd)
     return file_path
 
 def test_pdf_event_handler_creation(event_handler):
     """Test PDFEventHandler initialization"""
     assert event_handler.callback is not None
     assert event_handler.file_type == 'test'
-    assert isinstance(event_handler.processed_files, set)
-    assert event_handler.processing_queue is not None
+    assert isinstance(event_handler.processed_files, dict)
+    assert event_handler.executor is not None
 
 def test_pdf_event_handler_file_detection(event_handler, temp_dir):
     """Test PDF file detection"""
@@ -57,7 +67,7 @@ def test_pdf_event_handler_file_detection(event_handler, temp_dir):
     event_handler.on_created(Event())
     
     # Wait for processing
-    time.sleep(2)
+    assert event_handler.wait_until_idle(timeout=5)
     
     # Verify callback was called
     event_handler.callback.assert_called_once_with(str(pdf_path))
@@ -157,20 +167,38 @@ def test_auto_processor_cleanup(auto_processor, temp_dir):
     # Create an offer PDF
     offer_path = create_pdf_file(temp_dir, 'offer.pdf')
     
-    # Add offer with old timestamp
-    with patch('datetime.datetime') as mock_datetime:
-        # Set current time to past
-        mock_datetime.now.return_value = mock_datetime.now.return_value.replace(
-            day=mock_datetime.now.return_value.day - 2
-        )
-        auto_processor.handle_offer(str(offer_path))
+    auto_processor.handle_offer(str(offer_path))
+    
+    # Not expired yet
+    assert auto_processor.remove_expired_offers() is not None
+    assert str(offer_path) in auto_processor.pending_offers
     
-    # Wait for cleanup
-    time.sleep(2)
+    # Run the cleanup as it would be once the TTL has passed
+    later = time.monotonic() + file_monitor.PENDING_OFFER_TTL
+    assert auto_processor.remove_expired_offers(now=later) is None
     
     # Verify offer was removed
     assert str(offer_path) not in auto_processor.pending_offers
 
+def test_pending_offer_expiry(auto_processor, temp_dir, monkeypatch):
+    """Test that pending offers are removed once their TTL expires"""
+    monkeypatch.setattr(file_monitor, 'PENDING_OFFER_TTL', 0.2)
+    
+    expiring_path = create_pdf_file(temp_dir, 'expiring.pdf')
+    auto_processor.handle_offer(str(expiring_path))
+    
+    # Offers detected later expire later
+    time.sleep(0.1)
+    later_path = create_pdf_file(temp_dir, 'later.pdf')
+    auto_processor.handle_offer(str(later_path))
+    
+    time.sleep(0.15)
+    assert str(expiring_path) not in auto_processor.pending_offers
+    assert str(later_path) in auto_processor.pending_offers
+    
+    time.sleep(0.2)
+    assert not auto_processor.pending_offers
+
 def test_multiple_invoice_handling(auto_processor, temp_dir):
     """Test handling multiple invoices for one offer"""
     # Create PDFs
@@ -212,15 +240,142 @@ def test_duplicate_file_handling(event_handler, temp_dir):
     event_handler.on_created(Event())
     
     # Wait for processing
-    time.sleep(2)
+    assert event_handler.wait_until_idle(timeout=5)
     
     # Verify callback was called only once
     assert event_handler.callback.call_count == 1
 
-def test_error_handling(event_handler, temp_dir):
+def test_processed_files_bounded(event_handler, temp_dir, monkeypatch):
+    """Test that the oldest processed PDFs are forgotten beyond the limit"""
+    monkeypatch.setattr(file_monitor, 'MAX_PROCESSED_FILES', 2)
+    
+    paths = [str(create_pdf_file(temp_dir, f'{name}.pdf')) for name in 'abc']
+    for path in paths:
+        class Event:
+            is_directory = False
+            src_path = path
+        event_handler.on_created(Event())
+    
+    assert list(event_handler.processed_files) == paths[1:]
+
+def test_resaved_file_handling(event_handler, temp_dir):
+    """Test that a re-saved file is processed again"""
+    # Create a PDF file
+    pdf_path = create_pdf_file(temp_dir, 'test.pdf')
+    
+    class Event:
+        is_directory = False
+        src_path = str(pdf_path)
+    
+    event_handler.on_created(Event())
+    assert event_handler.wait_until_idle(timeout=5)
+    
+    # Simulate saving the file again with a new modification time
+    stat = pdf_path.stat()
+    os.utime(pdf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    event_handler.on_modified(Event())
+    
+    # Wait for processing
+    assert event_handler.wait_until_idle(timeout=5)
+    
+    # Verify both versions were processed
+    assert event_handler.callback.call_count == 2
+
+def test_file_written_in_steps(event_handler, temp_dir, monkeypatch):
+    """Test that a PDF still being written is processed once, when complete"""
+    monkeypatch.setattr(file_monitor, 'SETTLE_DELAY', 0.5)
+    pdf_path = create_pdf_file(temp_dir, 'test.pdf')
+    
+    class Event:
+        is_directory = False
+        src_path = str(pdf_path)
+    
+    sizes = []
+    event_handler.callback = lambda path: sizes.append(os.path.getsize(path))
+    event_handler.on_created(Event())
+    
+    # Each write reports a modified event for a new mtime
+    stat = pdf_path.stat()
+    for step in range(1, 4):
+        time.sleep(0.1)
+        with open(pdf_path, 'ab') as f:
+            f.write(PDF_BYTES)
+        os.utime(pdf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 1_000_000_000))
+        event_handler.on_modified(Event())
+    
+    assert event_handler.wait_until_idle(timeout=5)
+    assert sizes == [4 * len(PDF_BYTES)]
+
+def test_settling_burst_uses_no_extra_threads(event_handler, temp_dir, monkeypatch):
+    """Test that a burst of settling PDFs is waited for by one thread"""
+    monkeypatch.setattr(file_monitor, 'SETTLE_DELAY', 0.5)
+    paths = [str(create_pdf_file(temp_dir, f'{i}.pdf')) for i in range(50)]
+    threads = threading.active_count()
+    
+    for path in paths:
+        class Event:
+            is_directory = False
+            src_path = path
+        event_handler.on_created(Event())
+        event_handler.on_modified(Event())
+    
+    assert threading.active_count() == threads
+    assert event_handler.wait_until_idle(timeout=5)
+    assert event_handler.callback.call_count == len(paths)
+
+def test_stop_drops_settling_files(event_handler, temp_dir):
+    """Test that stopping forgets PDFs that have not settled yet"""
+    pdf_path = create_pdf_file(temp_dir, 'test.pdf')
+    
+    class Event:
+        is_directory = False
+        src_path = str(pdf_path)
+    
+    event_handler.on_created(Event())
+    event_handler.stop()
+    
+    assert event_handler.wait_until_idle(timeout=0)
+    event_handler.callback.assert_not_called()
+
+def test_resaved_file_close_events(mock_callback, temp_dir):
+    """Test that every closed version of a file is processed"""
+    handler = PDFEventHandler(mock_callback, 'test', close_events=True)
+    pdf_path = create_pdf_file(temp_dir, 'test.pdf')
+    
+    class Event:
+        is_directory = False
+        src_path = str(pdf_path)
+    
+    handler.on_closed(Event())
+    handler.on_closed(Event())
+    stat = pdf_path.stat()
+    os.utime(pdf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    handler.on_closed(Event())
+    
+    assert handler.wait_until_idle(timeout=5)
+    assert mock_callback.call_count == 2
+    handler.stop()
+
+def test_submit_after_shutdown(mock_callback, temp_dir):
+    """Test that a PDF rejected by a shut down executor does not block idling"""
+    handler = PDFEventHandler(mock_callback, 'test', close_events=True)
+    pdf_path = create_pdf_file(temp_dir, 'test.pdf')
+    
+    class Event:
+        is_directory = False
+        src_path = str(pdf_path)
+    
+    # As if stop() ran between the stopped check and the submit
+    handler.executor.shutdown()
+    handler.on_closed(Event())
+    
+    assert handler.wait_until_idle(timeout=0)
+    mock_callback.assert_not_called()
+
+def test_error_handling(event_handler, temp_dir, make_recorder):
     """Test error handling in file processing"""
     # Create a mock callback that raises an exception
-    event_handler.callback = Mock(side_effect=Exception("Test error"))
+    event_handler.callback = make_recorder(side_effect=Exception("Test error"))
     
     # Create a PDF file
     pdf_path = create_pdf_file(temp_dir, 'test.pdf')
@@ -234,10 +389,11 @@ def test_error_handling(event_handler, temp_dir):
     event_handler.on_created(Event())
     
     # Wait for processing
-    time.sleep(2)
+    assert event_handler.wait_until_idle(timeout=5)
     
     # Verify the file was processed despite the error
     assert str(pdf_path) in event_handler.processed_files
+    event_handler.callback.assert_called_once_with(str(pdf_path))
 
 def test_monitored_files_list(folder_monitor, temp_dir, mock_callback):
     """Test getting list of monitored files"""
@@ -259,7 +415,8 @@ def test_monitored_files_list(folder_monitor, temp_dir, mock_callback):
     invoice_pdf = create_pdf_file(invoices_path, 'invoice.pdf')
     
     # Wait for processing
-    time.sleep(2)
+    for handler in folder_monitor.handlers.values():
+        assert handler.wait_until_idle(timeout=5)
     
     # Get monitored files
     monitored_files = folder_monitor.get_monitored_files()
@@ -1,7 +1,7 @@
+import json
 import pytest
-from unittest.mock import Mock, patch
 from decimal import Decimal
-from src.notifier import SlackNotifier, NotificationConfig
+from src.notifier import SlackNotifier, NotificationConfig, MAX_BLOCKS_PER_MESSAGE, _create_session, _encode_json
 from datetime import datetime
 
 @pytest.fixture
@@ -19,7 +19,7 @@ def mock_config():
     )
 
 @pytest.fixture
-def notifier(mock_config):
+def notifier(mock_config, slack_transport):
     """Create a SlackNotifier instance with mock configuration"""
     return SlackNotifier(mock_config)
 
@@ -112,6 +112,14 @@ def test_should_send_notification(notifier, sample_summary):
         'total_items': 3
     })
 
+def test_triggers_follow_config_changes(notifier, sample_summary):
+    """Test that flags changed after construction are honoured"""
+    summary = {**sample_summary, 'quantity_mismatches': 0, 'price_mismatches': 0, 'missing_items': 1}
+    assert notifier._should_send_notification(summary)
+    
+    notifier.config.notify_missing_items = False
+    assert not notifier._should_send_notification(summary)
+
 def test_create_message_blocks(notifier, sample_comparison_results, sample_summary):
     """Test creation of Slack message blocks"""
     offer_path = '/test/offers/offer.pdf'
@@ -146,6 +154,26 @@ def test_create_message_blocks(notifier, sample_comparison_results, sample_summa
     assert 'Price Mismatches: 1' in summary_text
     assert 'Missing Items: 1' in summary_text
 
+def test_message_blocks_capped(notifier, sample_comparison_results, sample_summary):
+    """Test that large comparisons stay within Slack's block limit"""
+    results = sample_comparison_results * 100
+    
+    blocks = notifier._create_message_blocks('/path/to/offer.pdf', [], results, sample_summary)
+    
+    assert len(blocks) == MAX_BLOCKS_PER_MESSAGE
+    assert 'Only the first' in blocks[-2]['elements'][0]['text']
+
+def test_session_and_blocks_shared(mock_config, slack_transport, sample_comparison_results, sample_summary):
+    """Test that notifiers reuse one HTTP session and the static blocks"""
+    first = SlackNotifier(mock_config)
+    second = SlackNotifier(mock_config)
+    
+    assert first.session is second.session
+    
+    first_blocks = first._create_message_blocks('/a.pdf', [], sample_comparison_results, sample_summary)
+    second_blocks = second._create_message_blocks('/b.pdf', [], sample_comparison_results, sample_summary)
+    assert first_blocks[0] is second_blocks[0]
+
 def test_format_discrepancy(notifier):
     """Test formatting of individual discrepancies"""
     # Test quantity mismatch
@@ -179,14 +207,8 @@ def test_format_discrepancy(notifier):
     assert '27.50' in text
     assert '2.50' in text
 
-@patch('requests.Session')
-def test_send_comparison_results(mock_session, notifier, sample_comparison_results, sample_summary):
+def test_send_comparison_results(notifier, slack_transport, sample_comparison_results, sample_summary):
     """Test sending comparison results to Slack"""
-    # Mock the POST response
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_session.return_value.post.return_value = mock_response
-    
     result = notifier.send_comparison_results(
         offer_path='/test/offers/offer.pdf',
         invoice_paths=['/test/invoices/invoice.pdf'],
@@ -195,45 +217,54 @@ def test_send_comparison_results(mock_session, notifier, sample_comparison_resul
     )
     
     assert result is True
-    mock_session.return_value.post.assert_called_once()
+    assert len(slack_transport.posted) == 1
     
     # Verify the call arguments
-    call_args = mock_session.return_value.post.call_args
-    assert call_args[0][0] == 'https://hooks.slack.com/test'
-    assert 'blocks' in call_args[1]['json']
+    url, payload = slack_transport.posted[0]
+    assert url == 'https://hooks.slack.com/test'
+    assert 'blocks' in payload
 
-@patch('requests.Session')
-def test_send_error(mock_session, notifier):
-    """Test sending error notifications"""
-    # Mock the POST response
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_session.return_value.post.return_value = mock_response
+def test_encode_json():
+    """Test that payloads are encoded once as compact UTF-8 with exact amounts"""
+    body = _encode_json({'text': 'Größe ✅', 'amount': Decimal('27.50')})
     
+    assert isinstance(body, bytes)
+    assert json.loads(body) == {'text': 'Größe ✅', 'amount': '27.50'}
+    assert 'Größe'.encode('utf-8') in body
+
+def test_posts_only_retried_when_not_delivered():
+    """Test that webhook posts are not repeated after a possible delivery"""
+    retry = _create_session().get_adapter('https://hooks.slack.com').max_retries
+    
+    assert retry.total == 3
+    assert retry.read == 0
+    assert retry.is_retry('POST', 429)
+    assert not retry.is_retry('POST', 500)
+    assert not retry.is_retry('POST', 503)
+
+def test_send_error(notifier, slack_transport):
+    """Test sending error notifications"""
     result = notifier.send_error(
         error_message="Test error",
         details="Detailed error information"
     )
     
     assert result is True
-    mock_session.return_value.post.assert_called_once()
+    assert len(slack_transport.posted) == 1
     
     # Verify the call arguments
-    call_args = mock_session.return_value.post.call_args
-    assert call_args[0][0] == 'https://hooks.slack.com/test'
+    url, payload = slack_transport.posted[0]
+    assert url == 'https://hooks.slack.com/test'
     
-    blocks = call_args[1]['json']['blocks']
+    blocks = payload['blocks']
     assert any('Test error' in b['text']['text'] for b in blocks if b['type'] == 'section')
     assert any('Detailed error information' in b['text']['text'] for b in blocks if b['type'] == 'section')
 
-@patch('requests.Session')
-def test_failed_notification(mock_session, notifier, sample_comparison_results, sample_summary):
+def test_failed_notification(notifier, slack_transport, sample_comparison_results, sample_summary):
     """Test handling of failed notifications"""
-    # Mock a failed POST response
-    mock_response = Mock()
-    mock_response.status_code = 500
-    mock_response.text = "Internal Server Error"
-    mock_session.return_value.post.return_value = mock_response
+    # Simulate a failed POST response
+    slack_transport.status_code = 500
+    slack_transport.text = "Internal Server Error"
     
     result = notifier.send_comparison_results(
         offer_path='/test/offers/offer.pdf',
@@ -244,15 +275,33 @@ def test_failed_notification(mock_session, notifier, sample_comparison_results,
     
     assert result is False
 
+def test_background_sending(mock_config, slack_transport):
+    """Test that background messages are queued and merged into one post"""
+    notifier = SlackNotifier(mock_config, background=True)
+    
+    assert notifier.send_error(error_message="First error") is True
+    assert notifier.send_error(error_message="Second error") is True
+    
+    # Closing delivers everything still queued
+    notifier.close()
+    
+    assert len(slack_transport.posted) == 1
+    blocks = slack_transport.posted[0][1]['blocks']
+    texts = [b['text']['text'] for b in blocks if b['type'] == 'section']
+    assert any('First error' in text for text in texts)
+    assert any('Second error' in text for text in texts)
+
 def test_notification_thresholds(notifier, sample_summary):
     """Test notification thresholds"""
     # Modify config to set thresholds
     notifier.config.price_threshold = Decimal('5.0')
     notifier.config.quantity_threshold = 5
     
-    # Should not notify for small differences
+    # Should not notify for small differences; missing items notify
+    # regardless of the thresholds, so there are none here
     small_differences = {
         **sample_summary,
+        'missing_items': 0,
         'total_quantity_difference': Decimal('3'),
         'total_price_difference': Decimal('4.0')
     }
@@ -261,6 +310,7 @@ def test_notification_thresholds(notifier, sample_summary):
     # Should notify for differences above threshold
     large_differences = {
         **sample_summary,
+        'missing_items': 0,
         'total_quantity_difference': Decimal('6'),
         'total_price_difference': Decimal('6.0')
     }
@@ -2,6 +2,7 @@ import pytest
 from decimal import Decimal
 from pathlib import Path
 import tempfile
+from src import pdf_processor as pdf_processor_module
 from src.pdf_processor import PDFProcessor, Item, ComparisonResult
 
 @pytest.fixture
@@ -81,6 +82,111 @@ def test_extract_items_from_pdf(pdf_processor):
         # Clean up temporary file
         Path(pdf_path).unlink()
 
+def test_iter_items_from_pdf(pdf_processor):
+    """Test streaming items from a PDF"""
+    pdf_path = create_test_pdf("A123 Test Item 10 15.50\nB456 Other Item 5 25.00")
+    
+    try:
+        items = pdf_processor.iter_items_from_pdf(pdf_path)
+        assert not isinstance(items, list)
+        assert list(items) == pdf_processor.extract_items_from_pdf(pdf_path)
+        
+    finally:
+        Path(pdf_path).unlink()
+
+def test_extract_batch(pdf_processor):
+    """Test extracting several PDFs in worker processes"""
+    pdf_paths = [
+        create_test_pdf("A123 Test Item 10 15.50"),
+        create_test_pdf("B456 Other Item 5 25.00")
+    ]
+    
+    try:
+        expected = [pdf_processor.extract_items_from_pdf(path) for path in pdf_paths]
+        assert pdf_processor.extract_batch(pdf_paths, max_workers=2) == expected
+        assert pdf_processor.extract_batch(pdf_paths, max_workers=1) == expected
+        
+    finally:
+        for path in pdf_paths:
+            Path(path).unlink()
+
+def test_extraction_cache(tmp_path, monkeypatch):
+    """Test that unchanged PDFs are not parsed again"""
+    pdf_path = create_test_pdf("A123 Test Item 10 15.50")
+    parses = []
+    extract = PDFProcessor._extract_uncached
+    monkeypatch.setattr(PDFProcessor, '_extract_uncached',
+                        lambda self, path: parses.append(path) or extract(self, path))
+    
+    try:
+        processor = PDFProcessor(cache_dir=str(tmp_path))
+        items = processor.extract_items_from_pdf(pdf_path)
+        assert processor.extract_items_from_pdf(pdf_path) == items
+        assert len(parses) == 1
+        
+        # A new run loads the results from disk
+        pdf_processor_module._extract_cached.cache_clear()
+        assert processor.extract_items_from_pdf(pdf_path) == items
+        assert len(parses) == 1
+        
+    finally:
+        pdf_processor_module._extract_cached.cache_clear()
+        Path(pdf_path).unlink()
+
+def test_extraction_cache_by_content(tmp_path, monkeypatch):
+    """Test that copies of a PDF share one disk cache entry"""
+    pdf_path = create_test_pdf("A123 Test Item 10 15.50")
+    copy_path = tmp_path / 'copy.pdf'
+    copy_path.write_bytes(Path(pdf_path).read_bytes())
+    parses = []
+    extract = PDFProcessor._extract_uncached
+    monkeypatch.setattr(PDFProcessor, '_extract_uncached',
+                        lambda self, path: parses.append(path) or extract(self, path))
+    
+    try:
+        processor = PDFProcessor(cache_dir=str(tmp_path / 'cache'))
+        items = processor.extract_items_from_pdf(pdf_path)
+        assert processor.extract_items_from_pdf(str(copy_path)) == items
+        assert parses == [pdf_path]
+        
+    finally:
+        pdf_processor_module._extract_cached.cache_clear()
+        Path(pdf_path).unlink()
+
+def test_failed_extraction_not_cached(pdf_processor, monkeypatch):
+    """Test that a failed extraction is retried by the next call"""
+    pdf_path = create_test_pdf("A123 Test Item 10 15.50")
+    extract = PDFProcessor._extract_uncached
+    failures = [OSError("file is locked")]
+    
+    def flaky_extract(self, path):
+        if failures:
+            raise failures.pop()
+        return extract(self, path)
+    
+    monkeypatch.setattr(PDFProcessor, '_extract_uncached', flaky_extract)
+    
+    try:
+        assert pdf_processor.extract_items_from_pdf(pdf_path) == []
+        assert [item.item_code for item in pdf_processor.extract_items_from_pdf(pdf_path)] == ["A123"]
+        
+    finally:
+        pdf_processor_module._extract_cached.cache_clear()
+        Path(pdf_path).unlink()
+
+def test_extracted_items_are_copies(pdf_processor):
+    """Test that changing returned items does not affect later calls"""
+    pdf_path = create_test_pdf("A123 Test Item 10 15.50")
+    
+    try:
+        items = pdf_processor.extract_items_from_pdf(pdf_path)
+        items[0].quantity = Decimal("99")
+        assert pdf_processor.extract_items_from_pdf(pdf_path)[0].quantity == Decimal("10")
+        
+    finally:
+        pdf_processor_module._extract_cached.cache_clear()
+        Path(pdf_path).unlink()
+
 def test_compare_documents(pdf_processor, sample_items):
     """Test document comparison"""
     # Create modified items for invoice comparison
@@ -132,6 +238,53 @@ def test_compare_documents(pdf_processor, sample_items):
     extra_item = next(r for r in results if r.item_code == "D012")
     assert extra_item.status == "extra_item"
 
+def test_compare_documents_partial_deliveries(pdf_processor, sample_items):
+    """Test that invoice items delivered in parts are summed"""
+    first_delivery = Item(
+        item_code="A123",
+        description="Test Item 1",
+        quantity=Decimal("6"),
+        unit_price=Decimal("15.50"),
+        total_price=Decimal("93.00")
+    )
+    second_delivery = Item(
+        item_code="A123",
+        description="Test Item 1",
+        quantity=Decimal("4"),
+        unit_price=Decimal("15.50"),
+        total_price=Decimal("62.00")
+    )
+    
+    results = pdf_processor.compare_documents(sample_items[:1], [first_delivery, second_delivery])
+    
+    assert len(results) == 1
+    assert results[0].status == "match"
+    assert results[0].delivered_quantity == Decimal("10")
+    
+    # The invoice items themselves are not modified
+    assert first_delivery.quantity == Decimal("6")
+    assert first_delivery.total_price == Decimal("93.00")
+
+def test_compare_documents_zero_offer_price(pdf_processor):
+    """Test the price tolerance for items offered free of charge"""
+    free_item = Item(
+        item_code="F001",
+        description="Free Item",
+        quantity=Decimal("1"),
+        unit_price=Decimal("0"),
+        total_price=Decimal("0")
+    )
+    charged_item = Item(
+        item_code="F001",
+        description="Free Item",
+        quantity=Decimal("1"),
+        unit_price=Decimal("0.50"),
+        total_price=Decimal("0.50")
+    )
+    
+    assert pdf_processor.compare_documents([free_item], [free_item])[0].status == "match"
+    assert pdf_processor.compare_documents([free_item], [charged_item])[0].status == "price_mismatch"
+
 def test_parse_decimal(pdf_processor):
     """Test decimal parsing with various formats"""
     test_cases = [
@@ -11,6 +11,10 @@ import random
 from decimal import Decimal
 import fpdf
 
+# Width of each item table column, in table order
+COLUMN_WIDTHS = (30, 60, 30, 35, 35)
+TABLE_HEADER = ("Item Code", "Description", "Quantity", "Unit Price", "Total")
+
 class PDFGenerator:
     def __init__(self):
         self.items = [
@@ -36,6 +40,13 @@ class PDFGenerator:
             }
         ]
 
+    @staticmethod
+    def _table_row(pdf: fpdf.FPDF, cells):
+        """Write one bordered row of the item table"""
+        last = len(COLUMN_WIDTHS) - 1
+        for i, (width, text) in enumerate(zip(COLUMN_WIDTHS, cells)):
+            pdf.cell(width, 10, text, border=1, ln=i == last)
+
     def create_pdf(self, filename: str, title: str, items: list, date: datetime):
         """Create a PDF document with the specified items"""
         pdf = fpdf.FPDF()
@@ -52,11 +63,7 @@ class PDFGenerator:
         
         # Table header
         pdf.set_font("Arial", "B", 12)
-        pdf.cell(30, 10, "Item Code", border=1)
-        pdf.cell(60, 10, "Description", border=1)
-        pdf.cell(30, 10, "Quantity", border=1)
-        pdf.cell(35, 10, "Unit Price", border=1)
-        pdf.cell(35, 10, "Total", border=1, ln=True)
+        self._table_row(pdf, TABLE_HEADER)
         
         # Table content
         pdf.set_font("Arial", size=12)
@@ -68,14 +75,16 @@ class PDFGenerator:
             line_total = quantity * unit_price
             total += line_total
             
-            pdf.cell(30, 10, item['code'], border=1)
-            pdf.cell(60, 10, item['description'], border=1)
-            pdf.cell(30, 10, str(quantity), border=1)
-            pdf.cell(35, 10, f"€{unit_price:.2f}", border=1)
-            pdf.cell(35, 10, f"€{line_total:.2f}", border=1, ln=True)
+            self._table_row(pdf, (
+                item['code'],
+                item['description'],
+                str(quantity),
+                f"€{unit_price:.2f}",
+                f"€{line_total:.2f}"
+            ))
         
         # Total
-        pdf.cell(155, 10, "Total:", border=1)
+        pdf.cell(sum(COLUMN_WIDTHS[:-1]), 10, "Total:", border=1)
         pdf.cell(35, 10, f"€{total:.2f}", border=1, ln=True)
         
         # Save PDF
@@ -12,8 +12,15 @@ import shutil
 from datetime import datetime, timedelta
 import yaml
 import argparse
+import heapq
 import sqlite3
 
+# Prefer the libyaml-backed loader, falling back to pure Python
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +28,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Database pages copied per backup step; other connections may write
+# between steps
+BACKUP_PAGES_PER_STEP = 1024
+
+# Database backups kept when pruning old ones
+BACKUPS_TO_KEEP = 5
+
+# Old database records deleted per transaction
+DELETE_CHUNK_SIZE = 10000
+
+# One chunk of records older than the cutoff, stored as integers or as
+# legacy DateTime text (SQLite orders all TEXT after all INTEGER values)
+DELETE_CHUNK_STATEMENT = (
+    "DELETE FROM comparisons WHERE rowid IN ("
+    " SELECT rowid FROM comparisons"
+    " WHERE timestamp < ? OR (timestamp >= '' AND timestamp < ?)"
+    " LIMIT ?)"
+)
+
 class Maintenance:
     def __init__(self, config_path: str = "config/settings.yaml"):
         self.config = self._load_config(config_path)
@@ -29,7 +55,7 @@ class Maintenance:
         """Load configuration from YAML file"""
         try:
             with open(config_path) as f:
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=YamlLoader)
         except Exception as e:
             logger.error(f"Error loading configuration: {str(e)}")
             return {}
@@ -53,14 +79,19 @@ class Maintenance:
                 logger.warning(f"Log directory not found: {log_dir}")
                 return 0
             
-            cutoff = datetime.now() - timedelta(days=days)
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
             count = 0
             
-            for log_file in log_dir.glob('*.log*'):
-                if log_file.stat().st_mtime < cutoff.timestamp():
-                    log_file.unlink()
-                    count += 1
-                    logger.info(f"Deleted old log file: {log_file}")
+            # Current and rotated logs (*.log*); scandir reports each entry's
+            # type with the listing, and stat() is cached on the entry
+            with os.scandir(log_dir) as entries:
+                for entry in entries:
+                    if '.log' not in entry.name or not entry.is_file():
+                        continue
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        count += 1
+                        logger.info(f"Deleted old log file: {entry.path}")
             
             return count
             
@@ -88,18 +119,36 @@ class Maintenance:
                 return 0
             
             conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            # Delete old records
-            cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute(
-                "DELETE FROM comparisons WHERE timestamp < ?",
-                (cutoff,)
-            )
-            
-            count = cursor.rowcount
-            conn.commit()
-            conn.close()
+            try:
+                # Same journal settings as the application, so each chunk's
+                # commit is cheap and readers are not blocked meanwhile
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                # Lets the subselect range-scan instead of reading every row
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_comparisons_timestamp ON comparisons (timestamp)"
+                )
+                
+                # Timestamps are stored as integer UTC microseconds since the
+                # epoch; rows the application has not migrated yet still hold
+                # DateTime text
+                cutoff = datetime.utcnow() - timedelta(days=days)
+                cutoff_us = (cutoff - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+                cutoff_text = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+                
+                # Delete in bounded chunks, each in its own transaction
+                count = 0
+                while True:
+                    deleted = conn.execute(
+                        DELETE_CHUNK_STATEMENT,
+                        (cutoff_us, cutoff_text, DELETE_CHUNK_SIZE)
+                    ).rowcount
+                    conn.commit()
+                    count += deleted
+                    if deleted < DELETE_CHUNK_SIZE:
+                        break
+            finally:
+                conn.close()
             
             logger.info(f"Deleted {count} old database records")
             return count
@@ -156,13 +205,30 @@ class Maintenance:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_file = backup_path / f"comparison_history_{timestamp}.db"
             
-            shutil.copy2(db_path, backup_file)
+            # SQLite's online backup copies a consistent snapshot, including
+            # changes still in the WAL file that a plain file copy would miss
+            source = sqlite3.connect(db_path)
+            target = sqlite3.connect(backup_file)
+            try:
+                with target:
+                    source.backup(target, pages=BACKUP_PAGES_PER_STEP)
+            finally:
+                target.close()
+                source.close()
             logger.info(f"Database backed up to: {backup_file}")
             
-            # Clean up old backups (keep last 5)
-            backups = sorted(backup_path.glob('*.db'))
-            for old_backup in backups[:-5]:
-                old_backup.unlink()
+            # Clean up old backups; the names embed a sortable timestamp, so
+            # no stat is needed to order them and only the newest are ranked
+            with os.scandir(backup_path) as entries:
+                backups = [
+                    entry.path for entry in entries
+                    if entry.name.endswith('.db') and entry.is_file()
+                ]
+            keep = set(heapq.nlargest(BACKUPS_TO_KEEP, backups))
+            for old_backup in backups:
+                if old_backup in keep:
+                    continue
+                os.unlink(old_backup)
                 logger.info(f"Deleted old backup: {old_backup}")
             
             return True
@@ -184,11 +250,10 @@ class Maintenance:
         try:
             # Check data directory
             data_path = Path(self.config.get('database', {}).get('path', 'data/comparison_history.db')).parent
-            if not data_path.exists():
-                data_path.mkdir(parents=True)
+            data_path.mkdir(parents=True, exist_ok=True)
             
-            total, used, free = shutil.disk_usage(data_path)
-            free_mb = free // (1024 * 1024)  # Convert to MB
+            # A single statvfs on POSIX; also works on Windows, unlike os.statvfs
+            free_mb = shutil.disk_usage(data_path).free >> 20  # Convert to MB
             
             if free_mb < min_free_mb:
                 logger.warning(f"Low disk space: {free_mb}MB free, {min_free_mb}MB required")